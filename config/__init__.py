@@ -6,9 +6,111 @@ Proporciona una clase singleton para cargar y acceder a la configuración desde
 
 import os
 import yaml
-from typing import Any, Dict, Optional
+from dataclasses import MISSING, dataclass, fields
+from types import SimpleNamespace
+from typing import IO, Any, Dict, List, Optional, Tuple
 from utils.excepciones import ErrorConfiguracion
 
+# Usar el parser en C (libyaml) si está disponible
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+# Esquema de las secciones conocidas de config.yaml. Con slots el acceso a
+# los atributos es más rápido que en un SimpleNamespace (sin __dict__).
+
+
+@dataclass(slots=True)
+class CamaraCfg:
+    id_dispositivo: int
+    resolucion_captura: List[int]
+    resolucion_vista: List[int]
+    fps: int
+    modo_color: str
+    brillo: int
+    contraste: int
+    deteccion_automatica_resolucion: bool = False
+
+
+@dataclass(slots=True)
+class RegionBarrasCfg:
+    x: float
+    y: float
+    ancho: float
+    alto: float
+
+
+@dataclass(slots=True)
+class ProcesamientoCfg:
+    umbral_calidad: float
+    region_barras: RegionBarrasCfg
+    filtros: List[str]
+    busqueda_robusta: bool
+
+
+@dataclass(slots=True)
+class ArchivosCfg:
+    ruta_base: str
+    estructura_directorios: Any
+    sanitizar_nombre_carpeta: bool
+    caracteres_reemplazo: str
+    formato_fecha: str
+    formato_imagen: str
+    calidad_jpg: int
+    guardar_fallidas: bool
+    guardar_roi: bool
+    nombre_frente: str
+    nombre_reverso: str
+    nombre_roi: str
+    nombre_metadata: str
+    nombre_fallida: str
+    evitar_sobreescritura: bool
+    # Nivel DEFLATE de PNG: 0 = sin compresión, 1 = rápido, 6 = equilibrado,
+    # 9 = máximo (varias veces más lento por apenas un pequeño ahorro)
+    compresion_png: int = 3
+    # Metadatos como líneas de un registro NDJSON diario en ruta_base en lugar
+    # de un JSON por boleto
+    metadatos_ndjson: bool = False
+    # fsync de cada archivo y del directorio del boleto al finalizar la captura
+    durabilidad_estricta: bool = False
+
+
+@dataclass(slots=True)
+class UiCfg:
+    tema: str
+    mostrar_timestamp: bool
+    feedback_sonido: bool
+    tamano_miniatura: List[int]
+    actualizacion_ms: int
+
+
+@dataclass(slots=True)
+class LoggingCfg:
+    nivel_consola: str
+    nivel_archivo: str
+    ruta_logs: str
+    max_mb_log: int
+    dias_a_conservar: int
+
+
+@dataclass(slots=True)
+class DesarrolloCfg:
+    modo_depuracion: bool
+    simular_camara: bool
+    ruta_imagen_simulada: str
+
+
+_ESQUEMA_SECCIONES = {
+    "camara": CamaraCfg,
+    "procesamiento": ProcesamientoCfg,
+    "archivos": ArchivosCfg,
+    "ui": UiCfg,
+    "logging": LoggingCfg,
+    "desarrollo": DesarrolloCfg,
+}
+
 
 class Configuracion:
     """
@@ -23,11 +125,18 @@ class Configuracion:
     _instancia = None
     _config_data = None
     _config_path = None
+    _secciones = None
+    _claves_extra = None
+    _ruta_por_defecto = None
 
     def __new__(cls, config_path: Optional[str] = None):
         if cls._instancia is None:
             cls._instancia = super(Configuracion, cls).__new__(cls)
             cls._instancia._cargar_configuracion(config_path)
+
+            # Publicar la instancia para el acceso rápido de config()
+            global _instancia
+            _instancia = cls._instancia
         return cls._instancia
 
     @classmethod
@@ -45,29 +154,17 @@ class Configuracion:
         Raises:
             ErrorConfiguracion: Si no se puede cargar o validar la configuración.
         """
-        # Determinar la ruta del archivo de configuración
-        if config_path is None:
-            # Buscar en el directorio actual o en el directorio config/
-            posibles_rutas = [
-                "./config/config.yaml",
-                "./config.yaml",
-                os.path.join(os.path.dirname(__file__), "config.yaml"),
-            ]
-
-            for ruta in posibles_rutas:
-                if os.path.exists(ruta):
-                    config_path = ruta
-                    break
+        try:
+            # Determinar la ruta del archivo de configuración
+            if config_path is None:
+                config_path, archivo = self._abrir_ruta_por_defecto()
             else:
-                raise ErrorConfiguracion(
-                    "No se encontró el archivo de configuración config.yaml"
-                )
+                archivo = open(config_path, "r", encoding="utf-8")
 
-        self._config_path = config_path
+            self._config_path = config_path
 
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                self._config_data = yaml.safe_load(f)
+            with archivo as f:
+                self._config_data = yaml.load(f, Loader=_Loader)
 
             if self._config_data is None:
                 raise ErrorConfiguracion(
@@ -77,14 +174,55 @@ class Configuracion:
             # Validar estructura básica
             self._validar_configuracion()
 
-            # Convertir a objeto de acceso por puntos
-            self._config_data = self._dict_a_objeto(self._config_data)
+            # Convertir cada sección a su objeto de acceso por puntos; las
+            # claves que el esquema no conoce se guardan aparte
+            self._secciones = {}
+            self._claves_extra = {}
+            for nombre, datos in self._config_data.items():
+                seccion, extra = self._construir_seccion(nombre, datos)
+                self._secciones[nombre] = seccion
+                self._claves_extra.update(extra)
 
         except yaml.YAMLError as e:
             raise ErrorConfiguracion(f"Error al parsear YAML: {e}")
         except IOError as e:
             raise ErrorConfiguracion(f"Error al leer archivo de configuración: {e}")
 
+    @classmethod
+    def _abrir_ruta_por_defecto(cls) -> Tuple[str, IO[str]]:
+        """
+        Abre el primer config.yaml encontrado en las rutas por defecto.
+
+        La ruta encontrada se recuerda para que las recargas la prueben
+        primero en lugar de repetir la búsqueda.
+
+        Returns:
+            Tupla (ruta, archivo abierto).
+
+        Raises:
+            ErrorConfiguracion: Si no existe en ninguna de las rutas.
+        """
+        # Buscar en el directorio actual o en el directorio config/
+        posibles_rutas = [
+            "./config/config.yaml",
+            "./config.yaml",
+            os.path.join(os.path.dirname(__file__), "config.yaml"),
+        ]
+        if cls._ruta_por_defecto is not None:
+            posibles_rutas.insert(0, cls._ruta_por_defecto)
+
+        for ruta in posibles_rutas:
+            try:
+                archivo = open(ruta, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            cls._ruta_por_defecto = ruta
+            return ruta, archivo
+
+        raise ErrorConfiguracion(
+            "No se encontró el archivo de configuración config.yaml"
+        )
+
     def _validar_configuracion(self) -> None:
         """Valida la estructura básica de la configuración."""
         secciones_requeridas = ["camara", "procesamiento", "archivos", "ui", "logging"]
@@ -102,6 +240,77 @@ class Configuracion:
         if not isinstance(self._config_data["camara"].get("modo_color", ""), str):
             raise ErrorConfiguracion("camara.modo_color debe ser una cadena")
 
+    @classmethod
+    def _construir_seccion(
+        cls, nombre: str, datos: Any
+    ) -> Tuple[Any, Dict[str, Dict[str, Any]]]:
+        """
+        Construye el objeto de una sección de la configuración.
+
+        Las secciones conocidas se instancian con su dataclass del esquema
+        usando solo las claves que este define, de modo que los valores por
+        defecto se aplican siempre; las claves desconocidas se devuelven
+        aparte. Las secciones fuera del esquema se convierten a
+        SimpleNamespace.
+
+        Args:
+            nombre: Nombre de la sección en el YAML.
+            datos: Contenido de la sección.
+
+        Returns:
+            Tupla (objeto con acceso por puntos, claves desconocidas por
+            sección, p. ej. {"procesamiento.region_barras": {...}}).
+        """
+        clase = _ESQUEMA_SECCIONES.get(nombre)
+        if clase is None or not isinstance(datos, dict):
+            return cls._dict_a_objeto(datos), {}
+
+        claves_extra = {}
+        if nombre == "procesamiento" and isinstance(datos.get("region_barras"), dict):
+            region, extra = cls._instanciar_esquema(
+                RegionBarrasCfg, datos["region_barras"]
+            )
+            if extra:
+                claves_extra["procesamiento.region_barras"] = extra
+            datos = {**datos, "region_barras": region}
+
+        seccion, extra = cls._instanciar_esquema(clase, datos)
+        if extra:
+            claves_extra[nombre] = extra
+        return seccion, claves_extra
+
+    @classmethod
+    def _instanciar_esquema(
+        cls, clase: type, datos: Dict[str, Any]
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Instancia una dataclass del esquema con las claves que define.
+
+        Si faltan claves obligatorias no se puede crear la dataclass: se usa
+        un SimpleNamespace con los valores por defecto del esquema y los datos.
+
+        Args:
+            clase: Dataclass del esquema.
+            datos: Contenido de la sección.
+
+        Returns:
+            Tupla (objeto, claves que el esquema no define).
+        """
+        campos = fields(clase)
+        nombres = {campo.name for campo in campos}
+        conocidas = {clave: valor for clave, valor in datos.items() if clave in nombres}
+        extra = {clave: valor for clave, valor in datos.items() if clave not in nombres}
+        try:
+            return clase(**conocidas), extra
+        except TypeError:
+            # Faltan claves obligatorias del esquema
+            por_defecto = {
+                campo.name: campo.default
+                for campo in campos
+                if campo.default is not MISSING
+            }
+            return cls._dict_a_objeto({**por_defecto, **datos}), {}
+
     @staticmethod
     def _dict_a_objeto(d: Dict[str, Any]) -> Any:
         """
@@ -111,45 +320,54 @@ class Configuracion:
             d: Diccionario a convertir.
 
         Returns:
-            Objeto con acceso por puntos.
+            SimpleNamespace con acceso por puntos.
         """
-        if isinstance(d, dict):
-            # Crear una clase dinámica
-            class ObjetoConfig:
-                def __init__(self, diccionario):
-                    for clave, valor in diccionario.items():
-                        if isinstance(valor, dict):
-                            setattr(self, clave, Configuracion._dict_a_objeto(valor))
-                        elif isinstance(valor, list):
-                            # Convertir listas de diccionarios también
-                            nueva_lista = []
-                            for item in valor:
-                                if isinstance(item, dict):
-                                    nueva_lista.append(
-                                        Configuracion._dict_a_objeto(item)
-                                    )
-                                else:
-                                    nueva_lista.append(item)
-                            setattr(self, clave, nueva_lista)
-                        else:
-                            setattr(self, clave, valor)
-
-                def __repr__(self):
-                    return str(self.__dict__)
-
-            return ObjetoConfig(d)
-        else:
+        if not isinstance(d, dict):
             return d
 
+        objeto = SimpleNamespace()
+        atributos = vars(objeto)
+        for clave, valor in d.items():
+            if isinstance(valor, dict):
+                atributos[clave] = Configuracion._dict_a_objeto(valor)
+            elif isinstance(valor, list):
+                # Convertir listas de diccionarios también
+                atributos[clave] = [
+                    (
+                        Configuracion._dict_a_objeto(item)
+                        if isinstance(item, dict)
+                        else item
+                    )
+                    for item in valor
+                ]
+            else:
+                atributos[clave] = valor
+        return objeto
+
     def __getattr__(self, nombre: str) -> Any:
         """Permite acceso a la configuración mediante atributos."""
-        if self._config_data is None:
-            raise ErrorConfiguracion("Configuración no cargada")
+        try:
+            return self._secciones[nombre]
+        except KeyError:
+            raise AttributeError(
+                f"La configuración no tiene el atributo '{nombre}'"
+            ) from None
+        except TypeError:
+            # _secciones sigue en None: no se ha cargado ninguna configuración
+            raise ErrorConfiguracion("Configuración no cargada") from None
+
+    def obtener_claves_extra(self, seccion: str) -> Dict[str, Any]:
+        """
+        Devuelve las claves de una sección que el esquema no define.
 
-        if hasattr(self._config_data, nombre):
-            return getattr(self._config_data, nombre)
-        else:
-            raise AttributeError(f"La configuración no tiene el atributo '{nombre}'")
+        Args:
+            seccion: Nombre de la sección, p. ej. "archivos" o
+                "procesamiento.region_barras".
+
+        Returns:
+            Diccionario con las claves desconocidas (vacío si no hay).
+        """
+        return dict((self._claves_extra or {}).get(seccion, {}))
 
     def obtener_ruta_config(self) -> str:
         """Devuelve la ruta del archivo de configuración cargado."""
@@ -163,5 +381,12 @@ class Configuracion:
         return f"Configuracion(archivo='{self._config_path}')"
 
 
-# Alias para facilitar el acceso
-config = Configuracion.obtener_instancia
+# Instancia ya cargada; evita pasar por __new__ en cada llamada a config()
+_instancia: Optional[Configuracion] = None
+
+
+def config(config_path: Optional[str] = None) -> Configuracion:
+    """Alias para facilitar el acceso a la instancia singleton."""
+    if _instancia is not None:
+        return _instancia
+    return Configuracion.obtener_instancia(config_path)
@@ -4,6 +4,8 @@ Módulo para la gestión de la cámara web.
 Implementa un manejador de cámara con hilo separado y doble resolución.
 """
 
+import functools
+import logging
 import threading
 import time
 from typing import Optional, Tuple, Callable, Any
@@ -20,6 +22,55 @@ from utils.excepciones import ErrorCamara
 from config import config
 
 
+@functools.lru_cache(maxsize=4)
+def _construir_imagen_prueba(region: Tuple[float, float, float, float]) -> np.ndarray:
+    """
+    Dibuja la imagen sintética 4K del modo simulación.
+
+    El resultado se comparte entre instancias, por eso se devuelve como
+    solo lectura.
+
+    Args:
+        region: (x, y, ancho, alto) relativos de la región del código.
+
+    Returns:
+        Imagen BGR de 3840x2160 con un código de barras simulado.
+    """
+    # Crear fondo blanco
+    imagen = np.full((2160, 3840, 3), 255, dtype=np.uint8)
+
+    # Añadir texto
+    cv2.putText(
+        imagen,
+        "MODO SIMULACIÓN - BOLETO DE PRUEBA",
+        (100, 200),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        3,
+        (0, 0, 0),
+        5,
+    )
+
+    # Añadir código de barras simulado en la posición configurada
+    region_x, region_y, region_ancho, region_alto = region
+    x = int(3840 * region_x)
+    y = int(2160 * region_y)
+    ancho = int(3840 * region_ancho)
+    alto = int(2160 * region_alto)
+
+    # Crear patrón de barras: marcar las columnas de las 20 barras y
+    # pintarlas con una sola asignación (límites inclusivos, como rectangle)
+    paso = ancho // 20
+    ancho_barra = ancho // 40
+    columnas = np.zeros(imagen.shape[1], dtype=bool)
+    for i in range(20):
+        x1 = x + i * paso
+        columnas[x1 : x1 + ancho_barra + 1] = True
+    imagen[y : y + alto + 1, columnas] = 0
+
+    imagen.flags.writeable = False
+    return imagen
+
+
 class ManejadorCamara:
     """
     Gestiona una cámara web en un hilo separado para no bloquear la UI.
@@ -59,21 +110,34 @@ class ManejadorCamara:
         self._capturando = False
         self._frame_alta_res = None
         self._frame_vista = None
-        self._ultimo_frame_time = 0
         self._fps_real = 0.0
         self._conteo_frames = 0
-        self._tiempo_inicio = 0
+        self._tiempo_inicio_ns = 0
+
+        # Doble buffer para frames de alta resolución: el hilo escribe en el
+        # buffer libre y solo intercambia el índice bajo el lock
+        self._hr_buffers: Optional[list] = None
+        self._hr_idx = 0
 
         # Sincronización
         self._lock = threading.Lock()
+        self._nuevo_frame = threading.Condition(self._lock)
         self._evento_detener = threading.Event()
         self._hilo_captura: Optional[threading.Thread] = None
 
         # Objeto de captura OpenCV
         self._captura: Optional[cv2.VideoCapture] = None
 
-        # Observers (callbacks para notificar nuevos frames)
-        self._observers = []
+        # Parámetros y buffers de la vista previa (se recalculan en iniciar())
+        ancho_vista, alto_vista = self.config.camara.resolucion_vista
+        self._configurar_vista(ancho_vista, ancho_vista, alto_vista)
+
+        # Observers (callbacks para notificar nuevos frames). Tupla inmutable
+        # que se reemplaza al modificarse (copy-on-write)
+        self._observers: Tuple[Callable[[np.ndarray], Any], ...] = ()
+
+        # Generador para el ruido del modo simulación
+        self._rng = np.random.default_rng()
 
         # Configurar modo simulación si está activado
         self._modo_simulacion = self.config.desarrollo.simular_camara
@@ -128,34 +192,8 @@ class ManejadorCamara:
 
     def _crear_imagen_prueba(self) -> np.ndarray:
         """Crea una imagen de prueba sintética con código de barras simulado."""
-        # Crear fondo blanco
-        imagen = np.ones((2160, 3840, 3), dtype=np.uint8) * 255
-
-        # Añadir texto
-        cv2.putText(
-            imagen,
-            "MODO SIMULACIÓN - BOLETO DE PRUEBA",
-            (100, 200),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            3,
-            (0, 0, 0),
-            5,
-        )
-
-        # Añadir código de barras simulado en la posición configurada
         region = self.config.procesamiento.region_barras
-        x = int(3840 * region.x)
-        y = int(2160 * region.y)
-        ancho = int(3840 * region.ancho)
-        alto = int(2160 * region.alto)
-
-        # Crear patrón de barras
-        for i in range(20):
-            x1 = x + i * (ancho // 20)
-            x2 = x1 + (ancho // 40)
-            cv2.rectangle(imagen, (x1, y), (x2, y + alto), (0, 0, 0), -1)
-
-        return imagen
+        return _construir_imagen_prueba((region.x, region.y, region.ancho, region.alto))
 
     def agregar_observer(self, callback: Callable[[np.ndarray], Any]) -> None:
         """
@@ -165,26 +203,26 @@ class ManejadorCamara:
             callback: Función que recibe el frame de vista (720p).
         """
         with self._lock:
-            self._observers.append(callback)
+            self._observers = self._observers + (callback,)
         self.logger.debug(f"Observer agregado. Total: {len(self._observers)}")
 
     def remover_observer(self, callback: Callable[[np.ndarray], Any]) -> None:
         """Remueve un observer."""
         with self._lock:
             if callback in self._observers:
-                self._observers.remove(callback)
+                observers = list(self._observers)
+                observers.remove(callback)
+                self._observers = tuple(observers)
 
     def _notificar_observers(self, frame: np.ndarray) -> None:
         """Notifica a todos los observers sobre un nuevo frame."""
-        observers_actuales = []
-        with self._lock:
-            observers_actuales = self._observers.copy()
-
-        for observer in observers_actuales:
+        # La tupla se reemplaza completa al agregar/remover, así que se
+        # puede recorrer sin tomar el lock
+        for observer in self._observers:
             try:
                 observer(frame)
             except Exception as e:
-                self.logger.error(f"Error en observer: {e}")
+                self.logger.error("Error en observer: %s", e)
 
     def _detener_hilo_captura(self):
         """Detiene el hilo de captura de forma segura."""
@@ -222,6 +260,10 @@ class ManejadorCamara:
             try:
                 if self._modo_simulacion:
                     self.logger.info("Iniciando en modo simulación")
+                    self._configurar_vista(
+                        self._imagen_simulacion.shape[1],
+                        *self.config.camara.resolucion_vista,
+                    )
                     self._activa = True
                     self._iniciar_hilo_simulacion()
                     return True
@@ -233,6 +275,13 @@ class ManejadorCamara:
                 if not self._captura.isOpened():
                     raise ErrorCamara(f"No se pudo abrir cámara con ID {id_camara}")
 
+                # MJPG: la cámara envía frames comprimidos (evita saturar USB 2.0
+                # con YUY2 a Full HD). Se fija antes de la resolución porque
+                # algunos backends solo aceptan el cambio en ese orden
+                self._captura.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+                # Buffer de un frame: grab() siempre entrega el más reciente
+                self._captura.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
                 # USAR FULL HD (1920x1080) - MÁS ESTABLE QUE 3264x2448
                 ancho_objetivo, alto_objetivo = 1920, 1080
 
@@ -249,6 +298,13 @@ class ManejadorCamara:
 
                 self._resolucion_real = (ancho_real, alto_real)
 
+                # FOURCC efectivo (el backend puede ignorar MJPG)
+                codigo_fourcc = int(self._captura.get(cv2.CAP_PROP_FOURCC))
+                fourcc = "".join(
+                    chr((codigo_fourcc >> (8 * i)) & 0xFF) for i in range(4)
+                )
+                self.logger.info(f"FOURCC efectivo de la cámara: {fourcc!r}")
+
                 # Configurar FPS (más alto para Full HD)
                 fps_objetivo = 30
                 self._captura.set(cv2.CAP_PROP_FPS, fps_objetivo)
@@ -268,6 +324,7 @@ class ManejadorCamara:
                 relacion_aspecto = ancho_real / alto_real if alto_real > 0 else 16 / 9
                 alto_vista = int(ancho_vista / relacion_aspecto)
                 self._resolucion_vista_real = (ancho_vista, alto_vista)
+                self._configurar_vista(ancho_real, ancho_vista, alto_vista)
 
                 self.logger.info(
                     f"Cámara lista: {ancho_real}x{alto_real} -> "
@@ -288,7 +345,9 @@ class ManejadorCamara:
                     if ret and frame is not None:
                         with self._lock:
                             self._frame_alta_res = frame.copy()
-                            frame_vista = self._crear_frame_vista(frame)
+                            frame_vista = self._crear_frame_vista(
+                                frame, usar_buffer=False
+                            )
                             self._frame_vista = frame_vista
                         self.logger.info(
                             f"✓ Frame de calentamiento {warmup + 1} recibido"
@@ -312,7 +371,9 @@ class ManejadorCamara:
                     self.logger.info("✓ Frame directo recibido, continuando")
                     with self._lock:
                         self._frame_alta_res = frame.copy()
-                        self._frame_vista = self._crear_frame_vista(frame)
+                        self._frame_vista = self._crear_frame_vista(
+                            frame, usar_buffer=False
+                        )
                     return True
 
                 raise ErrorCamara("No se pudieron recibir frames")
@@ -345,9 +406,20 @@ class ManejadorCamara:
             self._frame_alta_res = None
             self._frame_vista = None
 
-    def capturar_frame_alta_resolucion(self) -> Optional[np.ndarray]:
+    def capturar_frame_alta_resolucion(
+        self, destino: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
         """
-        Captura un frame en la resolución nativa de la cámara con reintentos.
+        Captura un frame en la resolución nativa de la cámara.
+
+        Espera hasta 2 segundos a que el hilo de captura publique un frame.
+
+        Args:
+            destino: Array donde copiar el frame. Si su forma o tipo no
+                coinciden se asigna uno nuevo.
+
+        Returns:
+            El frame copiado (destino o un array nuevo) o None.
         """
         if not self._activa:
             self.logger.error("Cámara no activa")
@@ -355,27 +427,71 @@ class ManejadorCamara:
 
         self.logger.info("Solicitando frame de alta resolución...")
 
-        # Reintentar durante máximo 2 segundos (20 intentos de 100ms)
-        for i in range(20):
-            with self._lock:
-                if self._frame_alta_res is not None:
-                    frame_final = self._frame_alta_res.copy()
-                    self.logger.info(f"✓ Frame de alta obtenido en intento {i}")
-                    return frame_final
-
-                # Si el de alta no está listo, intentamos el de vista como respaldo
-                if self._frame_vista is not None:
-                    frame_final = self._frame_vista.copy()
-                    self.logger.info(
-                        f"✓ Usando frame de vista como respaldo en intento {i}"
-                    )
-                    return frame_final
+        # Esperar como máximo 2 segundos; el hilo de captura avisa en cuanto
+        # publica un frame nuevo
+        with self._nuevo_frame:
+            self._nuevo_frame.wait_for(
+                lambda: self._frame_alta_res is not None
+                or self._frame_vista is not None,
+                timeout=2.0,
+            )
 
-            time.sleep(0.1)
+            if self._frame_alta_res is not None:
+                frame_final = self._copiar_frame(self._frame_alta_res, destino)
+                self.logger.info("✓ Frame de alta obtenido")
+                return frame_final
+
+            # Si el de alta no está listo, intentamos el de vista como respaldo
+            if self._frame_vista is not None:
+                frame_final = self._copiar_frame(self._frame_vista, destino)
+                self.logger.info("✓ Usando frame de vista como respaldo")
+                return frame_final
 
         self.logger.error("No se pudo obtener ningún frame tras 2 segundos de espera")
         return None
 
+    @staticmethod
+    def _copiar_frame(frame: np.ndarray, destino: Optional[np.ndarray]) -> np.ndarray:
+        """Copia el frame en destino si es compatible; si no, en un array nuevo."""
+        if (
+            destino is not None
+            and destino.shape == frame.shape
+            and destino.dtype == frame.dtype
+        ):
+            np.copyto(destino, frame)
+            return destino
+        return frame.copy()
+
+    def _buffer_alta_res_libre(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Devuelve el buffer de alta resolución que no está publicado.
+
+        Args:
+            shape: Dimensiones del frame que se va a escribir.
+
+        Returns:
+            Buffer preasignado donde escribir el siguiente frame.
+        """
+        if self._hr_buffers is None or self._hr_buffers[0].shape != shape:
+            self._hr_buffers = [
+                np.empty(shape, dtype=np.uint8),
+                np.empty(shape, dtype=np.uint8),
+            ]
+            self._hr_idx = 0
+        return self._hr_buffers[1 - self._hr_idx]
+
+    def _publicar_frame_alta_res(self, buffer: np.ndarray) -> None:
+        """
+        Publica el buffer recién escrito como frame de alta resolución.
+
+        También acepta un array ajeno al par (p. ej. la imagen de
+        simulación); en ese caso ambos buffers quedan libres.
+        """
+        with self._nuevo_frame:
+            self._hr_idx ^= 1
+            self._frame_alta_res = buffer
+            self._nuevo_frame.notify_all()
+
     def _iniciar_hilo_captura(self) -> None:
         """Inicia el hilo de captura de video."""
         # CORRECCIÓN CRÍTICA: Establecer _capturando como True ANTES de iniciar el hilo
@@ -399,124 +515,176 @@ class ManejadorCamara:
 
     def _loop_captura(self) -> None:
         """Loop principal de captura de video."""
-        self._tiempo_inicio = time.time()
+        self._tiempo_inicio_ns = time.monotonic_ns()
         self._conteo_frames = 0
 
         # Pequeña pausa para estabilización
         time.sleep(0.1)
 
-        ultimo_frame_time = time.time()
+        ultimo_frame_ns = time.monotonic_ns()
 
-        while self._capturando and not self._evento_detener.is_set():
+        # Forma esperada de los frames; se corrige si la cámara entrega otra
+        ancho_real, alto_real = self.obtener_resolucion_real()
+        forma_frame = (alto_real, ancho_real, 3)
+
+        # Valores y métodos usados en cada iteración, resueltos una sola vez
+        captura = self._captura
+        if captura is None:
+            self.logger.warning("Cámara no disponible")
+            return
+        evento_detener = self._evento_detener
+        fps_objetivo = self.config.camara.fps
+        ns_por_frame = int(1_000_000_000 // fps_objetivo) if fps_objetivo > 0 else 0
+        buffer_libre = self._buffer_alta_res_libre
+        publicar = self._publicar_frame_alta_res
+        crear_vista = self._crear_frame_vista
+        notificar = self._notificar_observers
+        actualizar_metricas = self._actualizar_metricas
+        lock = self._lock
+        log_debug = self.logger.debug
+        log_error = self.logger.error
+        # El nivel se consulta una vez: con DEBUG desactivado no se llega a
+        # llamar al logger en cada frame
+        depuracion = self.logger.isEnabledFor(logging.DEBUG)
+
+        while self._capturando and not evento_detener.is_set():
             try:
                 # Verificar si la cámara está disponible
-                if self._captura is None or not self._captura.isOpened():
+                if not captura.isOpened():
                     self.logger.warning("Cámara no disponible")
                     break
 
-                # Leer frame
-                ret, frame = self._captura.read()
+                # grab() encola el frame; retrieve() lo decodifica directamente
+                # en el buffer libre, sin la asignación interna de read()
+                if not captura.grab():
+                    if depuracion:
+                        log_debug("Frame nulo, reintentando...")
+                    time.sleep(0.01)
+                    continue
+
+                buffer_alta = buffer_libre(forma_frame)
+                ret, frame = captura.retrieve(buffer_alta)
 
                 if not ret or frame is None:
-                    self.logger.debug("Frame nulo, reintentando...")
+                    if depuracion:
+                        log_debug("Frame nulo, reintentando...")
                     time.sleep(0.01)
                     continue
 
                 # Verificar tamaño
                 if frame.size == 0:
-                    self.logger.debug("Frame vacío")
+                    if depuracion:
+                        log_debug("Frame vacío")
                     time.sleep(0.01)
                     continue
 
+                # OpenCV asigna un array nuevo si el buffer no coincide
+                if frame is not buffer_alta:
+                    forma_frame = frame.shape
+                    buffer_alta = buffer_libre(forma_frame)
+                    np.copyto(buffer_alta, frame)
+
                 # Actualizar métricas
-                self._actualizar_metricas()
+                actualizar_metricas()
 
-                # Guardar frame de alta resolución
-                with self._lock:
-                    self._frame_alta_res = frame.copy()
+                # Publicar frame de alta resolución
+                publicar(buffer_alta)
 
                 # Crear frame de vista previa
-                frame_vista = self._crear_frame_vista(frame)
+                frame_vista = crear_vista(buffer_alta)
 
-                with self._lock:
+                with lock:
                     self._frame_vista = frame_vista
 
-                # NOTIFICAR OBSERVERS (IMPORTANTE)
-                self._notificar_observers(frame_vista)
+                # NOTIFICAR OBSERVERS (IMPORTANTE), solo si hay alguno
+                if self._observers:
+                    notificar(frame_vista)
 
                 # Control FPS - no dormir si estamos por debajo del objetivo
-                fps_objetivo = self.config.camara.fps
-                tiempo_actual = time.time()
-                tiempo_frame = tiempo_actual - ultimo_frame_time
-                ultimo_frame_time = tiempo_actual
+                ahora_ns = time.monotonic_ns()
+                espera_ns = ns_por_frame - (ahora_ns - ultimo_frame_ns)
+                ultimo_frame_ns = ahora_ns
 
-                # Calcular tiempo de espera para mantener FPS
-                if fps_objetivo > 0:
-                    tiempo_espera = max(0, (1.0 / fps_objetivo) - tiempo_frame)
-                    if tiempo_espera > 0:
-                        time.sleep(tiempo_espera)
+                # Esperar lo que falte para mantener los FPS objetivo
+                if espera_ns > 0:
+                    time.sleep(espera_ns / 1e9)
 
             except Exception as e:
-                self.logger.error(f"Error en loop de captura: {e}")
+                log_error("Error en loop de captura: %s", e)
                 time.sleep(0.1)
 
-        self.logger.debug("Loop de captura finalizado")
+        log_debug("Loop de captura finalizado")
 
     def _loop_simulacion(self) -> None:
         """Loop de simulación (para desarrollo sin cámara)."""
-        self._tiempo_inicio = time.time()
+        self._tiempo_inicio_ns = time.monotonic_ns()
         self._conteo_frames = 0
 
-        while self._capturando and not self._evento_detener.is_set():
+        # Valores y métodos usados en cada iteración, resueltos una sola vez
+        evento_detener = self._evento_detener
+        imagen = self._imagen_simulacion
+        enteros_aleatorios = self._rng.integers
+        buffer_libre = self._buffer_alta_res_libre
+        publicar = self._publicar_frame_alta_res
+        crear_vista = self._crear_frame_vista
+        notificar = self._notificar_observers
+        actualizar_metricas = self._actualizar_metricas
+        lock = self._lock
+        log_debug = self.logger.debug
+        log_error = self.logger.error
+        espera_s = 1.0 / 30  # Simular ~30 FPS
+
+        while self._capturando and not evento_detener.is_set():
             try:
-                # Usar imagen de simulación
-                frame = self._imagen_simulacion.copy()
-
                 # Añadir variación leve para simular video real
                 if self._conteo_frames % 30 == 0:
-                    # Pequeño cambio periódico
-                    variacion = np.random.normal(0, 5, frame.shape).astype(np.uint8)
-                    frame = cv2.add(frame, variacion)
+                    # Pequeño cambio periódico, sumado con saturación
+                    # directamente en el buffer libre
+                    variacion = enteros_aleatorios(0, 6, imagen.shape, dtype=np.uint8)
+                    frame = buffer_libre(imagen.shape)
+                    cv2.add(imagen, variacion, dst=frame)
+                else:
+                    # La imagen base nunca se modifica y los consumidores
+                    # la copian, así que se publica sin copiarla
+                    frame = imagen
 
                 # Actualizar métricas
-                self._actualizar_metricas()
+                actualizar_metricas()
 
                 # Guardar frame de alta resolución
-                with self._lock:
-                    self._frame_alta_res = frame.copy()
+                publicar(frame)
 
                 # Crear frame de vista previa
-                frame_vista = self._crear_frame_vista(frame)
+                frame_vista = crear_vista(frame)
 
-                with self._lock:
+                with lock:
                     self._frame_vista = frame_vista
 
-                # Notificar observers
-                self._notificar_observers(frame_vista)
+                # Notificar observers, solo si hay alguno
+                if self._observers:
+                    notificar(frame_vista)
 
-                # Simular ~30 FPS
-                time.sleep(1 / 30)
+                time.sleep(espera_s)
 
             except Exception as e:
-                self.logger.error(f"Error en loop de simulación: {e}")
+                log_error("Error en loop de simulación: %s", e)
                 time.sleep(0.1)
 
-        self.logger.debug("Loop de simulación finalizado")
+        log_debug("Loop de simulación finalizado")
 
     def _actualizar_metricas(self) -> None:
         """Actualiza las métricas de FPS."""
         self._conteo_frames += 1
 
-        # Actualizar FPS cada segundo aproximadamente
-        tiempo_actual = time.time()
-        tiempo_transcurrido = tiempo_actual - self._tiempo_inicio
+        # Actualizar FPS cada segundo aproximadamente (reloj monotónico)
+        tiempo_actual_ns = time.monotonic_ns()
+        transcurrido_ns = tiempo_actual_ns - self._tiempo_inicio_ns
 
-        if tiempo_transcurrido >= 1.0:  # Cada segundo
-            if tiempo_transcurrido > 0:
-                self._fps_real = self._conteo_frames / tiempo_transcurrido
+        if transcurrido_ns >= 1_000_000_000:  # Cada segundo
+            self._fps_real = self._conteo_frames * 1e9 / transcurrido_ns
 
             # Reiniciar para siguiente medición
-            self._tiempo_inicio = tiempo_actual
+            self._tiempo_inicio_ns = tiempo_actual_ns
             self._conteo_frames = 0
 
     def obtener_resolucion_real(self) -> Tuple[int, int]:
@@ -538,34 +706,68 @@ class ManejadorCamara:
                 pass
         return tuple(self.config.camara.resolucion_captura)
 
-    def _crear_frame_vista(self, frame_alta_res: np.ndarray) -> np.ndarray:
+    def _configurar_vista(
+        self, ancho_origen: int, ancho_vista: int, alto_vista: int
+    ) -> None:
+        """
+        Precalcula tamaño, interpolación y buffers usados por _crear_frame_vista.
+
+        Args:
+            ancho_origen: Ancho de los frames de alta resolución.
+            ancho_vista: Ancho de la vista previa.
+            alto_vista: Alto de la vista previa.
+        """
+        self._vista_size = (int(ancho_vista), int(alto_vista))
+
+        # INTER_AREA da mejor calidad al reducir más de 2x
+        if ancho_vista > 0 and ancho_origen / ancho_vista > 2:
+            self._vista_interp = cv2.INTER_AREA
+        else:
+            self._vista_interp = cv2.INTER_LINEAR
+
+        # Dos buffers alternados: mientras uno está publicado como
+        # _frame_vista, el hilo de captura escribe en el otro
+        forma = (self._vista_size[1], self._vista_size[0], 3)
+        self._vista_bufs = [np.empty(forma, np.uint8), np.empty(forma, np.uint8)]
+        self._vista_idx = 0
+
+    def _crear_frame_vista(
+        self, frame_alta_res: np.ndarray, usar_buffer: bool = True
+    ) -> np.ndarray:
         """
         Crea un frame de vista previa desde un frame de alta resolución.
 
+        Con usar_buffer=True (hilo de captura) el resultado se escribe en uno
+        de los buffers preasignados, que se reutiliza dos llamadas después:
+        los observers que quieran conservar el frame deben copiarlo.
+
         Args:
             frame_alta_res: Frame en resolución real de la cámara.
+            usar_buffer: Si es False se asigna un array nuevo (para llamadas
+                fuera del hilo de captura).
 
         Returns:
             Frame redimensionado para vista previa.
         """
         try:
-            if hasattr(self, "_resolucion_vista_real"):
-                ancho_vista, alto_vista = self._resolucion_vista_real
-            else:
-                ancho_vista, alto_vista = self.config.camara.resolucion_vista
+            if not usar_buffer:
+                return cv2.resize(
+                    frame_alta_res, self._vista_size, interpolation=self._vista_interp
+                )
 
-            # Redimensionar manteniendo aspect ratio
-            frame_vista = cv2.resize(
+            destino = self._vista_bufs[self._vista_idx]
+            self._vista_idx ^= 1
+            return cv2.resize(
                 frame_alta_res,
-                (ancho_vista, alto_vista),
-                interpolation=cv2.INTER_LINEAR,
+                self._vista_size,
+                dst=destino,
+                interpolation=self._vista_interp,
             )
 
-            return frame_vista
-
         except Exception as e:
             self.logger.error(f"Error al crear frame de vista: {e}")
             # Devolver frame negro en caso de error
+            ancho_vista, alto_vista = self._vista_size
             return np.zeros((alto_vista, ancho_vista, 3), dtype=np.uint8)
 
     def obtener_frame_vista(self) -> Optional[np.ndarray]:
@@ -630,6 +832,7 @@ class ManejadorCamara:
         with self._lock:
             self._frame_alta_res = None
             self._frame_vista = None
+            self._hr_buffers = None
 
         # 4. Marcar como inactiva
         self._activa = False
@@ -4,6 +4,7 @@ Módulo principal que coordina todos los componentes de la aplicación.
 Clase BoletoCapturador que orquesta el flujo completo de captura.
 """
 
+import gc
 import time
 from datetime import datetime
 from typing import Optional, Tuple, Dict, Any, List
@@ -29,6 +30,17 @@ from core.decodificador import DecodificadorBarras, ResultadoDecodificacion
 from core.gestor_datos import GestorDatos
 from core.detector_barras import DetectorBarrasAutomatico, DeteccionBarras
 
+# Cada cuántos boletos guardados se fuerza una recolección de basura
+_BOLETOS_POR_RECOLECCION = 5
+
+# Intervalo mínimo entre decodificaciones en tiempo real (independiente de FPS)
+_INTERVALO_DECODIFICACION_S = 0.5
+
+# Huella del frame de vista: miniatura y diferencia media por debajo de la
+# cual se considera el mismo frame y se reutiliza la última detección
+_TAMANO_HUELLA_VISTA = (16, 8)
+_DIFERENCIA_MAXIMA_VISTA = 2.0
+
 
 class EstadoCaptura(Enum):
     """Estados posibles del proceso de captura."""
@@ -40,6 +52,23 @@ class EstadoCaptura(Enum):
     ERROR = "error"  # Error en el proceso
 
 
+# Estados como enteros para las comparaciones frecuentes; EstadoCaptura se
+# mantiene como API pública (ver BoletoCapturador.estado_enum)
+ESTADO_LISTO = 0
+ESTADO_FRENTE_CAPTURADO = 1
+ESTADO_REVERSO_CAPTURADO = 2
+ESTADO_GUARDANDO = 3
+ESTADO_ERROR = 4
+
+_NOMBRES_ESTADO = (
+    EstadoCaptura.LISTO.value,
+    EstadoCaptura.FRENTE_CAPTURADO.value,
+    EstadoCaptura.REVERSO_CAPTURADO.value,
+    EstadoCaptura.GUARDANDO.value,
+    EstadoCaptura.ERROR.value,
+)
+
+
 class BoletoCapturador:
     """
     Clase principal que coordina todos los componentes de captura de boletos.
@@ -67,7 +96,7 @@ class BoletoCapturador:
         self._detector_automatico = DetectorBarrasAutomatico(self._config)
 
         # 3. Estado y Estadísticas
-        self._estado = EstadoCaptura.LISTO
+        self._estado = ESTADO_LISTO
         self._errores_totales = 0
         self._procesados_totales = 0
         self._inicio_tiempo = time.time()
@@ -85,6 +114,28 @@ class BoletoCapturador:
         self.ultima_roi_coords = None
         self.ultima_resolucion_captura = None
 
+        # 6. ROI de respaldo (según config) por tamaño de frame (alto, ancho)
+        self._roi_respaldo_cache: Dict[Tuple[int, int], Tuple[int, int, int, int]] = {}
+
+        # 7. Buffer reutilizado por obtener_miniatura_frente
+        self._buffer_miniatura: Optional[np.ndarray] = None
+
+        # 8. Arrays reutilizados para los frames capturados. Se sobrescriben
+        #    en la siguiente captura: quien necesite conservar la imagen
+        #    más allá del boleto actual debe copiarla
+        self._slot_frente: Optional[np.ndarray] = None
+        self._slot_reverso: Optional[np.ndarray] = None
+
+        # 9. Próximo instante (time.monotonic) en que se permite decodificar
+        #    en tiempo real
+        self._proxima_decodificacion_t = 0.0
+
+        # 10. Huella del último frame analizado en tiempo real, su resultado
+        #     y la ROI detectada (para seguir intentando decodificarla)
+        self._huella_vista: Optional[np.ndarray] = None
+        self._roi_tiempo_real: Optional[Tuple[int, int, int, int]] = None
+        self._roi_deteccion_vista: Optional[np.ndarray] = None
+
         self.logger.info("BoletoCapturador inicializado exitosamente")
 
     # --- AÑADIR ESTAS PROPIEDADES PARA QUE LA UI FUNCIONE ---
@@ -96,24 +147,12 @@ class BoletoCapturador:
     @property
     def estado(self) -> str:
         """Retorna el nombre del estado actual."""
-        return self._estado.value
+        return _NOMBRES_ESTADO[self._estado]
 
     @property
     def config(self):
         return self._config
 
-    def _inicializar_componentes(self) -> None:
-        """Inicializa todos los componentes del sistema."""
-        self.logger.debug("Inicializando componentes...")
-
-        # Componentes principales
-        self._camara = ManejadorCamara(self._config)
-        self._procesador = ProcesadorImagen(self._config)
-        self._decodificador = DecodificadorBarras(self._config)
-        self._gestor_datos = GestorDatos(self._config)
-
-        self.logger.debug("Componentes inicializados")
-
     @property
     def camara(self):
         """Propiedad para acceder a la cámara (para previsualizador)."""
@@ -132,12 +171,12 @@ class BoletoCapturador:
     @property
     def estado_enum(self) -> EstadoCaptura:
         """Obtiene el estado como Enum."""
-        return self._estado
+        return EstadoCaptura(_NOMBRES_ESTADO[self._estado])
 
     @property
     def activo(self) -> bool:
         """Indica si el capturador está activo y listo para usar."""
-        return self._estado != EstadoCaptura.ERROR
+        return self._estado != ESTADO_ERROR
 
     @property
     def codigo_barras_actual(self) -> Optional[str]:
@@ -165,7 +204,7 @@ class BoletoCapturador:
             True si se inició correctamente, False en caso contrario.
         """
         try:
-            if self._estado != EstadoCaptura.LISTO:
+            if self._estado != ESTADO_LISTO:
                 self.logger.warning(
                     f"No se puede iniciar captura en estado: {self.estado}"
                 )
@@ -182,7 +221,7 @@ class BoletoCapturador:
 
         except Exception as e:
             self.logger.error(f"Error al iniciar captura: {e}")
-            self._estado = EstadoCaptura.ERROR
+            self._estado = ESTADO_ERROR
             self._errores_totales += 1
             return False
 
@@ -196,21 +235,22 @@ class BoletoCapturador:
         try:
             return self._camara.obtener_frame_vista()
         except Exception as e:
-            self.logger.debug(f"Error al obtener frame vista: {e}")
+            self.logger.debug("Error al obtener frame vista: %s", e)
             return None
 
     def capturar_frente(self) -> Tuple[bool, Optional[np.ndarray], str]:
         """Captura la cara frontal. Retorna (éxito, imagen, mensaje)."""
         try:
             self.logger.info("Capturando frente del boleto...")
-            frame_alta = self._camara.capturar_frame_alta_resolucion()
+            frame_alta = self._camara.capturar_frame_alta_resolucion(self._slot_frente)
 
             if frame_alta is None:
                 return False, None, "No se pudo obtener imagen de la cámara"
+            self._slot_frente = frame_alta
 
             # Guardar en el diccionario interno
             self._datos_actuales["imagen_frente"] = frame_alta
-            self._estado = EstadoCaptura.FRENTE_CAPTURADO
+            self._estado = ESTADO_FRENTE_CAPTURADO
 
             self.logger.info("Frente capturado exitosamente")
             return True, frame_alta, "Frente capturado"
@@ -239,17 +279,18 @@ class BoletoCapturador:
 
     def _reiniciar_para_siguiente_captura(self) -> None:
         """Reinicia el estado para la siguiente captura."""
-        self._estado = EstadoCaptura.LISTO
-        # CORRECCIÓN: Limpiar solo las variables que existen
-        self._datos_actuales = {
-            "imagen_frente": None,
-            "imagen_reverso": None,
-            "imagen_roi": None,
-            "codigo_barras": None,
-            "timestamp": None,
-        }
+        self._estado = ESTADO_LISTO
+        # Un código aún en vuelo es del boleto anterior: no debe llegar al nuevo
+        self._decodificador.descartar_pendiente()
+        self._limpiar_datos_actuales()
         self.ultima_roi_coords = None
 
+    def _limpiar_datos_actuales(self) -> None:
+        """Suelta las imágenes y datos de la captura actual reutilizando el dict."""
+        datos = self._datos_actuales
+        for clave in datos:
+            datos[clave] = None
+
     def reiniciar_captura_actual(self) -> bool:
         """
         Reinicia la captura actual, descartando los datos no guardados.
@@ -257,7 +298,7 @@ class BoletoCapturador:
         try:
             self.logger.info("Reiniciando captura actual...")
 
-            if self._estado == EstadoCaptura.GUARDANDO:
+            if self._estado == ESTADO_GUARDANDO:
                 self.logger.warning("No se puede reiniciar mientras se guarda")
                 return False
 
@@ -275,20 +316,66 @@ class BoletoCapturador:
             self.logger.error(f"Error al reiniciar captura: {e}")
             return False
 
+    @staticmethod
+    def _vista_solo_lectura(imagen: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Devuelve una vista de solo lectura de la imagen, sin copiar los píxeles.
+
+        Para modificarla, el llamador debe hacer su propia copia con
+        np.array(vista, copy=True).
+
+        Args:
+            imagen: Imagen almacenada o None.
+
+        Returns:
+            Vista no escribible o None.
+        """
+        if imagen is None:
+            return None
+        vista = imagen.view()
+        vista.flags.writeable = False
+        return vista
+
     def obtener_imagen_frente(self) -> Optional[np.ndarray]:
-        """Obtiene la imagen del frente capturada."""
-        frente = self._datos_actuales.get("imagen_frente")
-        return frente.copy() if frente is not None else None
+        """Obtiene la imagen del frente capturada (vista de solo lectura)."""
+        return self._vista_solo_lectura(self._datos_actuales.get("imagen_frente"))
 
     def obtener_imagen_reverso(self) -> Optional[np.ndarray]:
-        """Obtiene la imagen del reverso capturada."""
-        reverso = self._datos_actuales.get("imagen_reverso")
-        return reverso.copy() if reverso is not None else None
+        """Obtiene la imagen del reverso capturada (vista de solo lectura)."""
+        return self._vista_solo_lectura(self._datos_actuales.get("imagen_reverso"))
 
     def obtener_roi_barras(self) -> Optional[np.ndarray]:
-        """Obtiene la ROI del código de barras."""
-        roi = self._datos_actuales.get("imagen_roi")
-        return roi.copy() if roi is not None else None
+        """Obtiene la ROI del código de barras (vista de solo lectura)."""
+        return self._vista_solo_lectura(self._datos_actuales.get("imagen_roi"))
+
+    def obtener_miniatura_frente(self, tamano: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        Obtiene una miniatura escribible del frente capturado.
+
+        La miniatura se escribe en un buffer reutilizado entre llamadas; el
+        llamador debe copiarla si necesita conservarla.
+
+        Args:
+            tamano: Tupla (ancho, alto) de la miniatura.
+
+        Returns:
+            Miniatura redimensionada o None si no hay frente capturado.
+        """
+        frente = self._datos_actuales.get("imagen_frente")
+        if frente is None:
+            return None
+
+        ancho, alto = tamano
+        forma = (alto, ancho) + frente.shape[2:]
+        if self._buffer_miniatura is None or self._buffer_miniatura.shape != forma:
+            self._buffer_miniatura = np.empty(forma, dtype=frente.dtype)
+
+        return cv2.resize(
+            frente,
+            (ancho, alto),
+            dst=self._buffer_miniatura,
+            interpolation=cv2.INTER_AREA,
+        )
 
     def detectar_roi_tiempo_real(self) -> Optional[Tuple[int, int, int, int]]:
         """
@@ -296,91 +383,123 @@ class BoletoCapturador:
         Misma lógica que en captura posterior.
         """
         try:
+            # Recoger el código de la decodificación en segundo plano, si acabó
+            codigo = self._decodificador.obtener_resultado_async()
+            if codigo:
+                self._datos_actuales["codigo_barras"] = codigo
+                self.logger.debug("Detección tiempo real: %s", codigo)
+
             # 1. Obtener frame actual de la cámara
             frame_vista = self._camara.obtener_frame_vista()
             if frame_vista is None:
                 return None
 
-            # 2. Usar EXACTAMENTE el mismo detector que en captura posterior
-            deteccion = self._detector_automatico.detectar_rapido(frame_vista)
+            # 2. Si el frame no ha cambiado (cámara en pausa, escena quieta)
+            #    se reutiliza la última detección
+            huella = cv2.resize(
+                frame_vista, _TAMANO_HUELLA_VISTA, interpolation=cv2.INTER_AREA
+            )
+            anterior = self._huella_vista
+            if (
+                anterior is not None
+                and anterior.shape == huella.shape
+                and cv2.norm(huella, anterior, cv2.NORM_L1) / huella.size
+                < _DIFERENCIA_MAXIMA_VISTA
+            ):
+                # La decodificación sigue su propio intervalo aunque no se
+                # vuelva a detectar
+                if self._roi_deteccion_vista is not None:
+                    self._intentar_decodificacion_con_detector(
+                        self._roi_deteccion_vista
+                    )
+                return self._roi_tiempo_real
+
+            self._roi_deteccion_vista = None
+            coords = self._detectar_roi_en_frame(frame_vista)
+            self._huella_vista = huella
+            self._roi_tiempo_real = coords
+            return coords
 
-            if not deteccion:
-                return None
+        except Exception as e:
+            self.logger.debug("Error en detección tiempo real: %s", e)
+            return None
 
-            # 3. Obtener coordenadas
-            x, y, w, h = deteccion.coordenadas
+    def _detectar_roi_en_frame(
+        self, frame_vista: np.ndarray
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Ejecuta el detector rápido sobre un frame de vista.
 
-            # 4. Validar coordenadas
-            alto_vista, ancho_vista = frame_vista.shape[:2]
+        Args:
+            frame_vista: Frame de vista previa.
 
-            # Asegurar límites
-            x = max(0, min(x, ancho_vista - 1))
-            y = max(0, min(y, alto_vista - 1))
-            w = max(10, min(w, ancho_vista - x))
-            h = max(10, min(h, alto_vista - y))
+        Returns:
+            Coordenadas (x, y, w, h) ajustadas al frame o None.
+        """
+        # 1. Usar EXACTAMENTE el mismo detector que en captura posterior
+        deteccion = self._detector_automatico.detectar_rapido(frame_vista)
 
-            # Validar tamaño mínimo
-            if w < 30 or h < 10:
-                return None
+        if not deteccion:
+            return None
 
-            # 5. Guardar ROI para posible decodificación
-            if deteccion.roi is not None and deteccion.roi.size > 0:
-                # Intentar decodificación periódica
-                self._intentar_decodificacion_con_detector(deteccion.roi)
+        # 2. Obtener coordenadas
+        x, y, w, h = deteccion.coordenadas
 
-            # 6. Retornar coordenadas para previsualización
-            return (x, y, w, h)
+        # 3. Validar coordenadas
+        alto_vista, ancho_vista = frame_vista.shape[:2]
 
-        except Exception as e:
-            self.logger.debug(f"Error en detección tiempo real: {e}")
+        # Asegurar límites (comparaciones en línea, sin llamadas a min/max)
+        x = 0 if x < 0 else (ancho_vista - 1 if x >= ancho_vista else x)
+        y = 0 if y < 0 else (alto_vista - 1 if y >= alto_vista else y)
+        w = ancho_vista - x if w > ancho_vista - x else w
+        w = 10 if w < 10 else w
+        h = alto_vista - y if h > alto_vista - y else h
+        h = 10 if h < 10 else h
+
+        # Validar tamaño mínimo
+        if w < 30 or h < 10:
             return None
 
+        # 4. Guardar ROI para posible decodificación
+        if deteccion.roi is not None and deteccion.roi.size > 0:
+            self._roi_deteccion_vista = deteccion.roi
+            # Intentar decodificación periódica
+            self._intentar_decodificacion_con_detector(deteccion.roi)
+
+        # 5. Retornar coordenadas para previsualización
+        return (x, y, w, h)
+
     def _intentar_decodificacion_con_detector(self, roi: np.ndarray):
-        """Intenta decodificar usando el ROI del detector."""
-        # Solo intentar cada cierto tiempo
-        if not hasattr(self, "_contador_dec_detector"):
-            self._contador_dec_detector = 0
-
-        self._contador_dec_detector += 1
-
-        if self._contador_dec_detector % 20 == 0:  # Cada 20 frames
-            try:
-                codigo = self._decodificador.decodificar(roi)
-                if codigo:
-                    self._datos_actuales["codigo_barras"] = codigo
-                    self.logger.debug(f"Detección tiempo real: {codigo}")
-            except Exception:
-                pass
-
-    def _intentar_decodificacion_periodica(self, frame_vista, x, y, w, h):
-        """Intenta decodificar cada cierto tiempo sin sobrecargar."""
-        # Solo intentar cada 30 frames (~1 segundo a 30 FPS)
-        if not hasattr(self, "_contador_decodificacion"):
-            self._contador_decodificacion = 0
-
-        self._contador_decodificacion += 1
-
-        if self._contador_decodificacion % 30 == 0:  # Cada 30 frames
-            try:
-                # Recortar ROI
-                roi = frame_vista[y : y + h, x : x + w]
-                if roi.size > 0:
-                    # Decodificar
-                    codigo = self._decodificador.decodificar(roi)
-                    if codigo:
-                        self._datos_actuales["codigo_barras"] = codigo
-                        self.logger.debug(f"Código detectado en tiempo real: {codigo}")
-            except Exception as e:
-                pass  # Silenciar errores en tiempo real
+        """
+        Lanza la decodificación del ROI del detector en segundo plano.
+
+        El resultado se recoge en la siguiente llamada a detectar_roi_tiempo_real,
+        así el hilo de la interfaz no espera a pyzbar.
+        """
+        # Solo intentar cada cierto tiempo, sin depender de los FPS de la vista
+        ahora = time.monotonic()
+        if ahora < self._proxima_decodificacion_t:
+            return
+
+        if self._decodificador.decodificar_async(roi):
+            self._proxima_decodificacion_t = ahora + _INTERVALO_DECODIFICACION_S
 
     def capturar_reverso(self) -> bool:
         """Captura el reverso y detecta el código de barras."""
         self.logger.info("Capturando reverso del boleto...")
 
-        # 1. Obtener frame de alta resolución
-        frame = self._camara.capturar_frame_alta_resolucion()
+        # 1. Obtener frame de alta resolución. El slot no se reutiliza si aún
+        #    contiene el reverso aceptado de este boleto
+        destino = (
+            self._slot_reverso
+            if self._datos_actuales["imagen_reverso"] is None
+            else None
+        )
+        frame = self._camara.capturar_frame_alta_resolucion(destino)
         if frame is None:
             return False
+        if destino is not None or self._slot_reverso is None:
+            self._slot_reverso = frame
 
         # 2. Detectar y decodificar
         deteccion = self._detector_automatico.detectar(frame)
@@ -395,7 +514,7 @@ class BoletoCapturador:
                     "%Y%m%d_%H%M%S"
                 )
 
-                self._estado = EstadoCaptura.REVERSO_CAPTURADO
+                self._estado = ESTADO_REVERSO_CAPTURADO
                 return True
 
         return False
@@ -403,7 +522,7 @@ class BoletoCapturador:
     def finalizar_captura(self) -> Optional[Dict[str, Any]]:
         """Guarda los datos en disco y finaliza el proceso."""
         try:
-            self._estado = EstadoCaptura.GUARDANDO
+            self._estado = ESTADO_GUARDANDO
 
             codigo = self._datos_actuales.get("codigo_barras")
             if not codigo:
@@ -419,13 +538,17 @@ class BoletoCapturador:
 
             if resultado:
                 self._procesados_totales += 1
-                self._estado = EstadoCaptura.LISTO
+                self._estado = ESTADO_LISTO
+
+                # Liberar periódicamente ciclos que retengan frames grandes
+                if self._procesados_totales % _BOLETOS_POR_RECOLECCION == 0:
+                    gc.collect()
                 return self._datos_actuales
             return None
 
         except Exception as e:
             self.logger.error(f"Error al finalizar captura: {e}")
-            self._estado = EstadoCaptura.ERROR
+            self._estado = ESTADO_ERROR
             return None
 
     def detener(self) -> bool:
@@ -433,8 +556,11 @@ class BoletoCapturador:
         self.logger.info("Deteniendo BoletoCapturador...")
         try:
             self._camara.detener()
+            self._decodificador.cerrar()
+            self._detector_automatico.cerrar()
+            self._gestor_datos.cerrar()
             # Limpiar datos actuales
-            self._datos_actuales = {k: None for k in self._datos_actuales}
+            self._limpiar_datos_actuales()
             return True
         except Exception as e:
             self.logger.error(f"Error al detener BoletoCapturador: {e}")
@@ -443,7 +569,7 @@ class BoletoCapturador:
     def __del__(self):
         """Destructor para asegurar limpieza de recursos."""
         try:
-            if self._estado != EstadoCaptura.ERROR:
+            if self._estado != ESTADO_ERROR:
                 self.detener()
         except:
             pass  # Ignorar errores en destructor
@@ -462,13 +588,19 @@ class BoletoCapturador:
             if hasattr(self._camara, "obtener_frame_vista"):
                 frame = self._camara.obtener_frame_vista()
                 if frame is not None:
-                    alto, ancho = frame.shape[:2]
-                    region = self._config.procesamiento.region_barras
-                    x = int(ancho * region.x)
-                    y = int(alto * region.y)
-                    w = int(ancho * region.ancho)
-                    h = int(alto * region.alto)
-                    self.ultima_roi_coords = (x, y, w, h)
+                    tamano = frame.shape[:2]
+                    coords = self._roi_respaldo_cache.get(tamano)
+                    if coords is None:
+                        alto, ancho = tamano
+                        region = self._config.procesamiento.region_barras
+                        coords = (
+                            int(ancho * region.x),
+                            int(alto * region.y),
+                            int(ancho * region.ancho),
+                            int(alto * region.alto),
+                        )
+                        self._roi_respaldo_cache[tamano] = coords
+                    self.ultima_roi_coords = coords
 
         return self.ultima_roi_coords
 
@@ -1,10 +1,14 @@
 # core/decodificador.py
+import logging
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import cv2
 import numpy as np
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Union
 from dataclasses import dataclass  # Requerido
 from pyzbar.pyzbar import decode
+from pyzbar.pyzbar_error import PyZbarError
 from utils.logger import obtener_logger
 from utils.excepciones import ErrorDecodificacion
 
@@ -21,59 +25,351 @@ class ResultadoDecodificacion:
     intentos: int = 1
 
 
+# Caché de la última ROI: miniatura usada como huella, diferencia media
+# máxima para considerarla la misma imagen y usos de un resultado negativo
+_TAMANO_HUELLA = (16, 8)
+_DIFERENCIA_MAXIMA_HUELLA = 3.0
+_USOS_CACHE_NEGATIVO = 30
+
+# Lado mayor máximo de la ROI que se entrega a pyzbar; más resolución no mejora
+# la lectura de un código 1D y el escaneo es proporcional a los píxeles
+_LADO_MAXIMO_DECODIFICACION = 600
+
+# Binarización de Otsu (umbral calculado por OpenCV)
+_BINARIZACION_OTSU = cv2.THRESH_BINARY + cv2.THRESH_OTSU
+
+# Filas grises que separan las variantes apiladas en _iter_variantes
+_FILAS_SEPARADOR = 10
+
+# Kernel de realce (sharpen) para la última variante
+_KERNEL_REALCE = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32)
+
+
 class DecodificadorBarras:
     def __init__(self, config_obj=None):
         self.logger = obtener_logger(__name__)
         self.exitos = 0
         self.fallos = 0
 
+        # CLAHE reutilizado entre llamadas (crearlo reserva sus tablas)
+        self._clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+
+        # Resultado de la última ROI decodificada (ver _buscar_en_cache)
+        self._cache_forma = None
+        self._cache_huella = None
+        self._cache_resultado = None
+        self._cache_usos_restantes = 0
+
+        # Buffers de trabajo reutilizados, uno por etapa (ver _buffer)
+        self._buffers: Dict[str, np.ndarray] = {}
+
+        # Detector 1D de OpenCV (módulo barcode); None si no está disponible
+        self._detector_opencv = self._crear_detector_opencv()
+
+        # Decodificación en segundo plano (ver decodificar_async). El lock
+        # protege buffers, CLAHE y caché frente a llamadas síncronas simultáneas
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="decodificador"
+        )
+        self._pendiente: Optional[Future] = None
+
     def decodificar(self, roi: np.ndarray) -> Optional[str]:
         """Intenta decodificar el código de barras usando múltiples variantes de la imagen."""
         if roi is None:
             return None
 
+        with self._lock:
+            return self._decodificar(roi)
+
+    def decodificar_async(self, roi: np.ndarray) -> bool:
+        """
+        Lanza la decodificación de la ROI en el hilo del decodificador.
+
+        Solo hay una decodificación en curso: si la anterior no ha terminado
+        la ROI se descarta. El resultado se recoge con obtener_resultado_async.
+
+        Args:
+            roi: Región del código de barras. No debe modificarse después.
+
+        Returns:
+            True si se lanzó la decodificación, False si se descartó.
+        """
+        if roi is None or (self._pendiente is not None and not self._pendiente.done()):
+            return False
+        try:
+            self._pendiente = self._pool.submit(self.decodificar, roi)
+        except RuntimeError:
+            # El pool ya se cerró
+            return False
+        return True
+
+    def obtener_resultado_async(self) -> Optional[str]:
+        """
+        Recoge el resultado de la última decodificación en segundo plano.
+
+        Returns:
+            Código decodificado, o None si no ha terminado, falló o no hubo código.
+        """
+        pendiente = self._pendiente
+        if pendiente is None or not pendiente.done():
+            return None
+        self._pendiente = None
+        try:
+            return pendiente.result()
+        except Exception as e:
+            self.logger.debug("Error en decodificación en segundo plano: %s", e)
+            return None
+
+    def descartar_pendiente(self) -> None:
+        """
+        Descarta la decodificación en segundo plano pendiente, si la hay.
+
+        Si aún no empezó se cancela; si ya está en curso termina, pero
+        obtener_resultado_async no devolverá su resultado.
+        """
+        pendiente = self._pendiente
+        self._pendiente = None
+        if pendiente is not None:
+            pendiente.cancel()
+
+    def cerrar(self) -> None:
+        """Detiene el hilo de decodificación en segundo plano."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pendiente = None
+
+    def _decodificar(self, roi: np.ndarray) -> Optional[str]:
+        """Cuerpo de decodificar; se ejecuta con self._lock tomado."""
         inicio_t = time.time()
 
-        # Generamos versiones (Gris, CLAHE, BN, Sharpen, Invert)
-        versiones = self._preprocesar_variantes(roi)
+        # Las imágenes de un solo plano se usan tal cual, sin cvtColor
+        if roi.ndim == 2:
+            gris = roi
+        elif roi.shape[2] == 1:
+            gris = roi[:, :, 0]
+        else:
+            gris = cv2.cvtColor(
+                roi, cv2.COLOR_BGR2GRAY, dst=self._buffer("gris", roi.shape[:2])
+            )
+
+        # Reducir ROIs grandes (la ROI original no se modifica)
+        alto, ancho = gris.shape
+        escala = _LADO_MAXIMO_DECODIFICACION / max(alto, ancho)
+        if escala < 1.0:
+            ancho_red = max(1, int(ancho * escala))
+            alto_red = max(1, int(alto * escala))
+            gris = cv2.resize(
+                gris,
+                (ancho_red, alto_red),
+                dst=self._buffer("reducida", (alto_red, ancho_red)),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        # En una escena estática la ROI apenas cambia entre llamadas
+        huella = cv2.resize(gris, _TAMANO_HUELLA, interpolation=cv2.INTER_AREA)
+        en_cache, codigo = self._buscar_en_cache(gris.shape, huella)
+        if en_cache:
+            if codigo is None:
+                self.fallos += 1
+            else:
+                self.exitos += 1
+            return codigo
 
-        for i, version in enumerate(versiones):
+        # Primer intento: detector de OpenCV sobre la ROI sin variantes
+        codigo = self._decodificar_opencv(gris)
+        if codigo:
+            ms = (time.time() - inicio_t) * 1000
+            self.logger.info(f"✓ Decodificado con OpenCV ({ms:.1f}ms): {codigo}")
+            self.exitos += 1
+            self._guardar_en_cache(gris.shape, huella, codigo)
+            return codigo
+
+        depuracion = self.logger.isEnabledFor(logging.DEBUG)
+
+        # Respaldo con pyzbar: primero la ROI en gris y, solo si no decodifica,
+        # el resto de variantes apiladas en una única imagen. Las lecturas de
+        # la imagen apilada no necesitan filtrarse por franja: un escaneo 1D
+        # horizontal no cruza el separador, y ZBar funde en un solo rect las
+        # lecturas iguales de varias variantes
+        for i, version in enumerate(self._iter_variantes(gris)):
             try:
                 resultados = decode(version)
-                if resultados:
-                    # Extraer el contenido y asegurar que es string
-                    codigo_crudo = resultados[0].data.decode("utf-8")
-                    codigo_limpio = str(codigo_crudo).strip()
-
-                    if self._validar_codigo(codigo_limpio):
-                        ms = (time.time() - inicio_t) * 1000
-                        self.logger.info(
-                            f"✓ Decodificado en intento {i} ({ms:.1f}ms): {codigo_limpio}"
-                        )
-                        self.exitos += 1
-                        # Retornamos el string limpio para que el capturador lo reciba bien
-                        return codigo_limpio
-            except Exception as e:
-                self.logger.debug(f"Error en intento de decodificación {i}: {e}")
+            except (cv2.error, ValueError, PyZbarError) as e:
+                if depuracion:
+                    self.logger.debug("Error en intento de decodificación %d: %s", i, e)
                 continue
 
+            for resultado in resultados:
+                codigo_limpio = self._extraer_codigo(resultado.data)
+                if codigo_limpio is not None:
+                    ms = (time.time() - inicio_t) * 1000
+                    self.logger.info(
+                        f"✓ Decodificado en intento {i} ({ms:.1f}ms): {codigo_limpio}"
+                    )
+                    self.exitos += 1
+                    self._guardar_en_cache(gris.shape, huella, codigo_limpio)
+                    # Retornamos el string limpio para que el capturador lo reciba bien
+                    return codigo_limpio
+
         self.fallos += 1
+        self._guardar_en_cache(gris.shape, huella, None)
         return None
 
-    def _preprocesar_variantes(self, roi: np.ndarray) -> List[np.ndarray]:
-        gris = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if len(roi.shape) == 3 else roi
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        _, bn = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-        return [
-            gris,
-            clahe.apply(gris),
-            bn,
-            cv2.filter2D(gris, -1, kernel),
-            cv2.bitwise_not(bn),
-        ]
-
-    def _validar_codigo(self, codigo: str) -> bool:
+    def _crear_detector_opencv(self) -> Optional[Any]:
+        """
+        Crea el detector de códigos de barras de OpenCV si el build lo incluye.
+
+        Returns:
+            Instancia de cv2.barcode.BarcodeDetector o None.
+        """
+        try:
+            return cv2.barcode.BarcodeDetector()
+        except (AttributeError, cv2.error) as e:
+            self.logger.warning(f"Detector de barras de OpenCV no disponible: {e}")
+            return None
+
+    def _decodificar_opencv(self, gris: np.ndarray) -> Optional[str]:
+        """
+        Detecta y decodifica en una sola llamada con cv2.barcode.
+
+        Args:
+            gris: ROI en escala de grises.
+
+        Returns:
+            Código válido o None si no se pudo decodificar.
+        """
+        if self._detector_opencv is None:
+            return None
+
+        try:
+            ok, textos, _, _ = self._detector_opencv.detectAndDecodeWithType(gris)
+        except cv2.error as e:
+            self.logger.debug(f"Error en detector de OpenCV: {e}")
+            return None
+
+        if not ok or not textos:
+            return None
+
+        for texto in textos:
+            codigo = texto.strip()
+            if self._validar_codigo(codigo):
+                return codigo
+        return None
+
+    def _buscar_en_cache(self, forma: tuple, huella: np.ndarray) -> tuple:
+        """
+        Busca el resultado de una ROI prácticamente igual a la última decodificada.
+
+        Los resultados negativos solo se reutilizan un número limitado de veces
+        para que un pequeño cambio de enfoque o iluminación se vuelva a intentar.
+
+        Args:
+            forma: Forma de la ROI en escala de grises.
+            huella: Miniatura de la ROI.
+
+        Returns:
+            Tupla (encontrado, código o None).
+        """
+        if self._cache_huella is None or forma != self._cache_forma:
+            return False, None
+
+        diferencia = cv2.norm(huella, self._cache_huella, cv2.NORM_L1) / huella.size
+        if diferencia >= _DIFERENCIA_MAXIMA_HUELLA:
+            return False, None
+
+        if self._cache_resultado is None:
+            if self._cache_usos_restantes <= 0:
+                return False, None
+            self._cache_usos_restantes -= 1
+
+        return True, self._cache_resultado
+
+    def _guardar_en_cache(
+        self, forma: tuple, huella: np.ndarray, codigo: Optional[str]
+    ) -> None:
+        """Recuerda el resultado de la última ROI para _buscar_en_cache."""
+        self._cache_forma = forma
+        self._cache_huella = huella
+        self._cache_resultado = codigo
+        self._cache_usos_restantes = _USOS_CACHE_NEGATIVO
+
+    def _buffer(self, nombre: str, forma: tuple) -> np.ndarray:
+        """
+        Devuelve el buffer uint8 de una etapa, reasignándolo solo si cambia la forma.
+
+        Se guarda un único buffer por etapa para que el tamaño variable de las
+        ROIs en tiempo real no acumule memoria.
+
+        Args:
+            nombre: Etapa del preprocesado.
+            forma: Forma (alto, ancho) requerida.
+
+        Returns:
+            Array reutilizable de esa forma.
+        """
+        buffer = self._buffers.get(nombre)
+        if buffer is None or buffer.shape != forma:
+            buffer = np.empty(forma, dtype=np.uint8)
+            self._buffers[nombre] = buffer
+        return buffer
+
+    def _iter_variantes(self, gris: np.ndarray) -> Iterator[np.ndarray]:
+        """
+        Genera las imágenes que se pasan a pyzbar, de la más a la menos probable.
+
+        Primero la ROI en gris. Después BN (Otsu), CLAHE, Invertida y Sharpen
+        apiladas verticalmente en una sola imagen, separadas por franjas grises,
+        para resolverlas con una única llamada a pyzbar. Las imágenes se
+        escriben en buffers reutilizables, válidos hasta la siguiente llamada.
+
+        Args:
+            gris: Región del código de barras en escala de grises.
+
+        Yields:
+            Imagen en escala de grises lista para pyzbar.
+        """
+        yield gris
+
+        alto, ancho = gris.shape
+        paso = alto + _FILAS_SEPARADOR
+        apilada = self._buffer("apilada", (paso * 4 - _FILAS_SEPARADOR, ancho))
+        for k in range(1, 4):
+            apilada[k * paso - _FILAS_SEPARADOR : k * paso] = 128
+
+        # Cada franja ocupa filas completas de un buffer contiguo, así que
+        # OpenCV escribe directamente sobre ella
+        bn, clahe, invertida, realce = (
+            apilada[k * paso : k * paso + alto] for k in range(4)
+        )
+        cv2.threshold(gris, 0, 255, _BINARIZACION_OTSU, dst=bn)
+        self._clahe.apply(gris, dst=clahe)
+        cv2.bitwise_not(bn, dst=invertida)
+        cv2.filter2D(gris, -1, _KERNEL_REALCE, dst=realce)
+        yield apilada
+
+    def _extraer_codigo(self, datos: bytes) -> Optional[str]:
+        """
+        Convierte el contenido crudo de pyzbar en un código válido.
+
+        La longitud se comprueba sobre los bytes antes de crear el string
+        (un str UTF-8 nunca es más largo que sus bytes).
+
+        Args:
+            datos: Contenido devuelto por pyzbar.
+
+        Returns:
+            Código limpio o None si no es válido.
+        """
+        datos = datos.strip()
+        if not self._validar_codigo(datos):
+            return None
+        try:
+            codigo = datos.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            return None
+        return codigo if self._validar_codigo(codigo) else None
+
+    def _validar_codigo(self, codigo: Union[str, bytes]) -> bool:
         return len(codigo) >= 8
 
     def obtener_estadisticas(self):
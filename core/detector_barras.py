@@ -6,6 +6,7 @@ Incluye extensión del ROI 20% hacia abajo para capturar código numérico.
 
 import cv2
 import numpy as np
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
 from typing import Optional, Tuple, List, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
@@ -14,6 +15,23 @@ import time
 from utils.logger import obtener_logger
 from utils.excepciones import ErrorDeteccionBarras
 
+try:
+    from pyzbar.pyzbar import ZBarSymbol, decode as _pyzbar_decode
+
+    # Simbologías lineales de los boletos; el resto (QR, I25...) no se busca
+    _PYZBAR_SYMBOLS = [
+        ZBarSymbol.CODE128,
+        ZBarSymbol.EAN13,
+        ZBarSymbol.EAN8,
+        ZBarSymbol.CODE39,
+    ]
+except ImportError:
+    _pyzbar_decode = None
+
+# Peso por simbología al elegir entre varios resultados de pyzbar; CODE128 es
+# la de los boletos
+_PRIORIDAD_TIPO = {"CODE128": 1.0, "EAN13": 0.8, "EAN8": 0.7, "CODE39": 0.6}
+
 
 class EstrategiaDeteccion(Enum):
     """Estrategias de detección disponibles."""
@@ -24,6 +42,55 @@ class EstrategiaDeteccion(Enum):
     CONTORNOS_MORFOLOGICOS = "contornos_morfologicos"
 
 
+# Ancho de trabajo aproximado de las estrategias heurísticas y reducción máxima
+_ANCHO_DETECCION = 640
+_REDUCCION_MAXIMA = 4
+
+# Miniatura (ancho, alto) y desviación típica mínima del sondeo de contraste
+_TAMANO_SONDEO_CONTRASTE = (160, 90)
+_DESVIACION_MINIMA = 15.0
+
+
+def _puntaje_resultado(resultado: Any) -> float:
+    """
+    Puntúa un resultado de pyzbar por el área de su polígono y su simbología.
+
+    Args:
+        resultado: Resultado devuelto por pyzbar.
+
+    Returns:
+        Área del rectángulo envolvente ponderada por _PRIORIDAD_TIPO.
+    """
+    xs = [p.x for p in resultado.polygon]
+    ys = [p.y for p in resultado.polygon]
+    area = (max(xs) - min(xs)) * (max(ys) - min(ys))
+    return area * _PRIORIDAD_TIPO.get(resultado.type, 0.5)
+
+
+def _segmentos_continuos(
+    mascara: np.ndarray, longitud_minima: float
+) -> List[Tuple[int, int]]:
+    """
+    Encuentra los tramos continuos a True de una máscara 1D.
+
+    Solo se cuentan los tramos cerrados (seguidos de un False) y más largos que
+    longitud_minima, igual que el recorrido elemento a elemento al que sustituye.
+
+    Args:
+        mascara: Máscara booleana 1D.
+        longitud_minima: Longitud que un tramo debe superar.
+
+    Returns:
+        Lista de tuplas (inicio, fin) con fin exclusivo.
+    """
+    cambios = np.diff(mascara.astype(np.int8), prepend=0)
+    inicios = np.flatnonzero(cambios == 1)
+    fines = np.flatnonzero(cambios == -1)
+    inicios = inicios[: fines.size]
+    validos = fines - inicios > longitud_minima
+    return list(zip(inicios[validos].tolist(), fines[validos].tolist()))
+
+
 @dataclass
 class DeteccionBarras:
     """Resultado de la detección de un código de barras."""
@@ -56,6 +123,19 @@ class DetectorBarrasAutomatico:
         self.extension_porcentaje = 100  # 20% hacia abajo
         self.margen_superior_porcentaje = 20  # 5% margen superior
 
+        # Objetos de OpenCV reutilizados entre llamadas
+        self._clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        self._kern_horiz_grad = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 3))
+        self._kern_rect = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 5))
+        self._kern_dilate = np.ones((1, 15), np.uint8)
+
+        # Buffers de trabajo reutilizados, uno por etapa (ver _buffer)
+        self._buffers: Dict[str, np.ndarray] = {}
+
+        # Hilos para las estrategias 2-4 de detectar (OpenCV libera el GIL)
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="detector")
+        self._en_curso: List[Future] = []
+
         self.logger.info("DetectorBarrasAutomatico inicializado")
 
     def detectar(self, imagen: np.ndarray) -> Optional[DeteccionBarras]:
@@ -77,31 +157,46 @@ class DetectorBarrasAutomatico:
         except Exception as e:
             self.logger.debug(f"pyzbar falló: {e}")
 
-        # ESTRATEGIA 2: Gradientes
-        deteccion = self._detectar_con_gradientes(imagen)
-        if deteccion and deteccion.confianza >= self.min_confianza:
-            deteccion.tiempo_ms = (time.time() - inicio) * 1000
-            self.detecciones_exitosas += 1
-            self.logger.info(f"✓ Gradientes exitoso (conf: {deteccion.confianza:.2f})")
-            return deteccion
+        # Escala de grises reducida compartida por el resto de estrategias
+        gris, escala = self._preparar_gris(imagen)
 
-        # ESTRATEGIA 3: Proyecciones
-        deteccion = self._detectar_con_proyecciones(imagen)
-        if deteccion and deteccion.confianza >= self.min_confianza:
-            deteccion.tiempo_ms = (time.time() - inicio) * 1000
-            self.detecciones_exitosas += 1
-            self.logger.info(
-                f"✓ Proyecciones exitoso (conf: {deteccion.confianza:.2f})"
-            )
-            return deteccion
+        # Sin contraste no puede haber barras: se omiten las estrategias 2-4
+        if self._contraste_plano(gris):
+            self.detecciones_fallidas += 1
+            self.logger.debug("Imagen sin contraste, se omiten las estrategias 2-4")
+            return None
 
-        # ESTRATEGIA 4: Contornos
-        deteccion = self._detectar_con_contornos(imagen)
-        if deteccion and deteccion.confianza >= self.min_confianza:
-            deteccion.tiempo_ms = (time.time() - inicio) * 1000
-            self.detecciones_exitosas += 1
-            self.logger.info(f"✓ Contornos exitoso (conf: {deteccion.confianza:.2f})")
-            return deteccion
+        # ESTRATEGIAS 2-4: Gradientes, Proyecciones y Contornos en paralelo.
+        # Se conserva la prioridad: gana la primera válida en este orden y las
+        # que aún no empezaron se cancelan
+        estrategias = (
+            ("Gradientes", self._detectar_con_gradientes),
+            ("Proyecciones", self._detectar_con_proyecciones),
+            ("Contornos", self._detectar_con_contornos),
+        )
+        try:
+            self._en_curso = [
+                self._pool.submit(estrategia, imagen, gris, escala)
+                for _, estrategia in estrategias
+            ]
+        except RuntimeError:
+            # El pool ya se cerró (cerrar): un tick de la vista aún en curso
+            return None
+        for (nombre, _), futuro in zip(estrategias, self._en_curso):
+            try:
+                deteccion = futuro.result()
+            except CancelledError:
+                # cerrar() canceló las estrategias que aún no empezaron
+                return None
+            if deteccion and deteccion.confianza >= self.min_confianza:
+                for pendiente in self._en_curso:
+                    pendiente.cancel()
+                deteccion.tiempo_ms = (time.time() - inicio) * 1000
+                self.detecciones_exitosas += 1
+                self.logger.info(
+                    f"✓ {nombre} exitoso (conf: {deteccion.confianza:.2f})"
+                )
+                return deteccion
 
         # Si todas fallan
         self.detecciones_fallidas += 1
@@ -109,6 +204,84 @@ class DetectorBarrasAutomatico:
         self.logger.warning(f"✗ No se detectó código después de {tiempo_total:.1f}ms")
         return None
 
+    def _buffer(
+        self, nombre: str, forma: Tuple[int, ...], dtype: Any = np.uint8
+    ) -> np.ndarray:
+        """
+        Devuelve el buffer de una etapa; solo se reasigna si cambia forma o tipo.
+
+        Args:
+            nombre: Etapa del procesado.
+            forma: Forma requerida.
+            dtype: Tipo de los elementos.
+
+        Returns:
+            Array reutilizable de esa forma y tipo.
+        """
+        buffer = self._buffers.get(nombre)
+        if buffer is None or buffer.shape != forma or buffer.dtype != dtype:
+            buffer = np.empty(forma, dtype=dtype)
+            self._buffers[nombre] = buffer
+        return buffer
+
+    def _a_gris(self, imagen: np.ndarray) -> np.ndarray:
+        """Convierte la imagen a escala de grises (sin copiar si ya lo está)."""
+        if imagen.ndim == 2:
+            return imagen
+        return cv2.cvtColor(
+            imagen, cv2.COLOR_BGR2GRAY, dst=self._buffer("gris", imagen.shape[:2])
+        )
+
+    def _preparar_gris(self, imagen: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Prepara la imagen en grises, reducida, para las estrategias heurísticas.
+
+        Solo buscan un rectángulo grande, así que se trabaja a ~640 px de ancho
+        (factor entero de 1 a 4); el ROI final se recorta de la imagen original.
+
+        Args:
+            imagen: Imagen completa.
+
+        Returns:
+            Tupla (gris reducida, factor de reducción).
+        """
+        # Una estrategia de la llamada anterior puede seguir usando los buffers
+        if self._en_curso:
+            wait(self._en_curso)
+            self._en_curso = []
+
+        gris = self._a_gris(imagen)
+        alto, ancho = gris.shape[:2]
+        escala = max(1, min(ancho // _ANCHO_DETECCION, _REDUCCION_MAXIMA))
+        if escala > 1:
+            alto, ancho = alto // escala, ancho // escala
+            gris = cv2.resize(
+                gris,
+                (ancho, alto),
+                dst=self._buffer("gris_reducida", (alto, ancho)),
+                interpolation=cv2.INTER_AREA,
+            )
+        return gris, escala
+
+    def _contraste_plano(self, gris: np.ndarray) -> bool:
+        """
+        Indica si la imagen es demasiado uniforme para contener un código.
+
+        Args:
+            gris: Imagen en escala de grises.
+
+        Returns:
+            True si la desviación típica de una miniatura no llega al mínimo.
+        """
+        miniatura = cv2.resize(
+            gris,
+            _TAMANO_SONDEO_CONTRASTE,
+            dst=self._buffer("sondeo_contraste", _TAMANO_SONDEO_CONTRASTE[::-1]),
+            interpolation=cv2.INTER_AREA,
+        )
+        _, desviacion = cv2.meanStdDev(miniatura)
+        return desviacion[0, 0] < _DESVIACION_MINIMA
+
     def _extender_roi_con_texto(
         self, coordenadas: Tuple[int, int, int, int], imagen: np.ndarray
     ) -> Tuple[int, int, int, int]:
@@ -128,37 +301,72 @@ class DetectorBarrasAutomatico:
         if h <= 0 or w <= 0:
             return coordenadas
 
-        # Calcular extensión hacia abajo (20% del alto actual)
-        extension_px = int(h * self.extension_porcentaje / 100)
+        alto_img, ancho_img = imagen.shape[:2]
 
-        # Margen superior (5%)
-        margen_superior_px = int(h * self.margen_superior_porcentaje / 100)
+        # Extensión hacia abajo, margen superior y márgenes laterales (10%) en
+        # aritmética entera
+        extension_px = h * self.extension_porcentaje // 100
+        margen_superior_px = h * self.margen_superior_porcentaje // 100
+        margen_lateral_px = w * 10 // 100
 
-        # Nuevas coordenadas
-        y_ext = max(0, y - margen_superior_px)
-        h_ext = h + extension_px + margen_superior_px
+        # Nuevas coordenadas, ajustadas a los límites de la imagen
+        y_ext = y - margen_superior_px if y > margen_superior_px else 0
+        h_ext = min(alto_img - y_ext, h + extension_px + margen_superior_px)
+        x_ext = x - margen_lateral_px if x > margen_lateral_px else 0
+        w_ext = min(ancho_img - x_ext, w + 2 * margen_lateral_px)
 
-        # Ajustar a límites de la imagen
-        alto_disponible = imagen.shape[0] - y_ext
-        h_final = min(h_ext, alto_disponible)
+        return (x_ext, y_ext, w_ext, h_ext)
 
-        # Mantener ancho con márgenes laterales
-        margen_lateral_px = int(w * 0.10)  # 10% lateral
-        x_ext = max(0, x - margen_lateral_px)
-        w_ext = min(imagen.shape[1] - x_ext, w + 2 * margen_lateral_px)
+    def _detectar_con_pyzbar(
+        self, imagen: np.ndarray, sondeo: bool = False
+    ) -> Optional[DeteccionBarras]:
+        """
+        Usa pyzbar para detectar y localizar código.
 
-        return (x_ext, y_ext, w_ext, h_final)
+        Args:
+            imagen: Imagen BGR o en escala de grises.
+            sondeo: Si es True (vista previa), las imágenes grandes se
+                sondean antes a media resolución y, si ahí no aparece
+                código, no se escanean completas. Los códigos finos pueden
+                perderse al reducir, por eso la captura no lo usa.
 
-    def _detectar_con_pyzbar(self, imagen: np.ndarray) -> Optional[DeteccionBarras]:
-        """Usa pyzbar para detectar y localizar código."""
+        Returns:
+            Detección encontrada o None.
+        """
         try:
-            from pyzbar.pyzbar import decode
+            if _pyzbar_decode is None:
+                return None
 
-            resultados = decode(imagen)
+            alto, ancho = imagen.shape[:2]
+            factor = 1
+            if sondeo and max(alto, ancho) > 800:
+                # Sondeo barato a media resolución: si no hay código no se
+                # escanea la imagen completa
+                reducida = cv2.resize(
+                    imagen, (ancho // 2, alto // 2), interpolation=cv2.INTER_AREA
+                )
+                resultados = _pyzbar_decode(reducida, symbols=_PYZBAR_SYMBOLS)
+                if not resultados:
+                    return None
+
+                # Refinar a resolución completa; si no lo encuentra ahí, se
+                # reescala el polígono del sondeo
+                completos = _pyzbar_decode(imagen, symbols=_PYZBAR_SYMBOLS)
+                if completos:
+                    resultados = completos
+                else:
+                    factor = 2
+            else:
+                resultados = _pyzbar_decode(imagen, symbols=_PYZBAR_SYMBOLS)
 
             if resultados:
-                resultado = resultados[0]
-                puntos = [(p.x, p.y) for p in resultado.polygon]
+                # Con varios códigos en la imagen se queda el mejor, no el primero
+                resultado = (
+                    max(resultados, key=_puntaje_resultado)
+                    if len(resultados) > 1
+                    else resultados[0]
+                )
+                puntos = [(p.x * factor, p.y * factor) for p in resultado.polygon]
                 x_coords = [p[0] for p in puntos]
                 y_coords = [p[1] for p in puntos]
 
@@ -216,32 +424,57 @@ class DetectorBarrasAutomatico:
 
         return None
 
-    def _detectar_con_gradientes(self, imagen: np.ndarray) -> Optional[DeteccionBarras]:
+    def _detectar_con_gradientes(
+        self, imagen: np.ndarray, gris: np.ndarray, escala: int = 1
+    ) -> Optional[DeteccionBarras]:
         """Detección basada en gradientes verticales."""
         try:
-            alto, ancho = imagen.shape[:2]
+            # gris puede estar reducido (escala > 1): los análisis se hacen en
+            # sus dimensiones y las coordenadas se devuelven a la imagen original
+            alto, ancho = gris.shape[:2]
+            min_ancho = self.min_ancho / escala
+            min_alto = self.min_alto / escala
 
             # 1. Preprocesamiento
-            gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            gris = clahe.apply(gris)
-
-            # 2. Gradientes verticales
-            grad_x = cv2.Sobel(gris, cv2.CV_32F, 1, 0, ksize=3)
-            grad_x = np.absolute(grad_x)
-            grad_x = (
-                np.uint8(255 * grad_x / grad_x.max()) if grad_x.max() > 0 else grad_x
+            gris = self._clahe.apply(gris, dst=self._buffer("clahe", gris.shape))
+
+            # 2. Gradientes verticales. Sobel en 16 bits y valor absoluto +
+            #    conversión a uint8 en una sola pasada (|Sobel 3x3| <= 1020,
+            #    así que alpha=0.25 evita saturar)
+            grad_x = cv2.Sobel(
+                gris,
+                cv2.CV_16S,
+                1,
+                0,
+                dst=self._buffer("sobel", gris.shape, np.int16),
+                ksize=3,
+            )
+            grad_x = cv2.convertScaleAbs(
+                grad_x, dst=self._buffer("gradiente", gris.shape), alpha=0.25
+            )
+            # Estiramiento a 0-255 en una pasada, sobre el mismo buffer
+            grad_x = cv2.normalize(
+                grad_x, grad_x, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U
             )
 
             # 3. Umbralización
             umbral = cv2.adaptiveThreshold(
-                grad_x, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+                grad_x,
+                255,
+                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY,
+                11,
+                2,
+                dst=self._buffer("umbral", gris.shape),
             )
 
             # 4. Operaciones morfológicas
-            kernel_horiz = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 3))
             cerrado = cv2.morphologyEx(
-                umbral, cv2.MORPH_CLOSE, kernel_horiz, iterations=2
+                umbral,
+                cv2.MORPH_CLOSE,
+                self._kern_horiz_grad,
+                dst=self._buffer("cerrado_gradientes", gris.shape),
+                iterations=2,
             )
 
             # 5. Componentes conectados
@@ -252,31 +485,35 @@ class DetectorBarrasAutomatico:
             mejor_region = None
             mejor_puntaje = 0
 
-            for i in range(1, num_labels):
-                x = stats[i, cv2.CC_STAT_LEFT]
-                y = stats[i, cv2.CC_STAT_TOP]
-                w = stats[i, cv2.CC_STAT_WIDTH]
-                h = stats[i, cv2.CC_STAT_HEIGHT]
-                area = stats[i, cv2.CC_STAT_AREA]
-
-                # Validaciones
-                if w < self.min_ancho or h < self.min_alto:
-                    continue
-                if w > ancho * 0.8 or h > alto * 0.5:
-                    continue
-
-                relacion = w / h if h > 0 else 0
-                if relacion < 1.5 or relacion > 15.0:
-                    continue
-
-                densidad = area / (w * h)
-                if densidad < 0.2 or densidad > 0.8:
-                    continue
-
-                # Uniformidad vertical
+            # Filtros de tamaño, relación y densidad vectorizados sobre stats (sin
+            # la fila 0, el fondo); solo las regiones que los pasan llegan al bucle
+            anchos = stats[1:, cv2.CC_STAT_WIDTH]
+            altos = stats[1:, cv2.CC_STAT_HEIGHT]
+            relaciones = anchos / altos
+            densidades = stats[1:, cv2.CC_STAT_AREA] / (anchos * altos)
+            validas = (
+                (anchos >= min_ancho)
+                & (altos >= min_alto)
+                & (anchos <= ancho * 0.8)
+                & (altos <= alto * 0.5)
+                & (relaciones >= 1.5)
+                & (relaciones <= 15.0)
+                & (densidades >= 0.2)
+                & (densidades <= 0.8)
+            )
+            indices = np.flatnonzero(validas)
+            area_referencia = ancho * alto * 0.1
+
+            for (x, y, w, h, area), relacion, densidad in zip(
+                stats[indices + 1].tolist(),
+                relaciones[indices].tolist(),
+                densidades[indices].tolist(),
+            ):
+                # Uniformidad vertical (conteo por columna sin máscara booleana
+                # intermedia; la reducción recorre filas contiguas)
                 region_binaria = cerrado[y : y + h, x : x + w]
-                proyeccion_h = np.sum(region_binaria > 0, axis=0) / h
-                cobertura_vertical = np.mean(proyeccion_h > 0.3)
+                proyeccion_h = np.count_nonzero(region_binaria, axis=0)
+                cobertura_vertical = np.count_nonzero(proyeccion_h > 0.3 * h) / w
 
                 if cobertura_vertical < 0.4:
                     continue
@@ -286,7 +523,7 @@ class DetectorBarrasAutomatico:
                     min(relacion, 8.0) / 8.0 * 0.3
                     + min(densidad, 0.6) / 0.6 * 0.2
                     + cobertura_vertical * 0.3
-                    + min(area / (ancho * alto * 0.1), 1.0) * 0.2
+                    + min(area / area_referencia, 1.0) * 0.2
                 )
 
                 if puntaje > mejor_puntaje:
@@ -297,6 +534,7 @@ class DetectorBarrasAutomatico:
                 x, y, w, h, confianza = mejor_region
 
                 # 🔧 EXTENDER ROI 20% HACIA ABAJO
+                x, y, w, h = x * escala, y * escala, w * escala, h * escala
                 coords_original = (x, y, w, h)
                 x_ext, y_ext, w_ext, h_ext = self._extender_roi_con_texto(
                     coords_original, imagen
@@ -327,80 +565,71 @@ class DetectorBarrasAutomatico:
         return None
 
     def _detectar_con_proyecciones(
-        self, imagen: np.ndarray
+        self, imagen: np.ndarray, gris: np.ndarray, escala: int = 1
     ) -> Optional[DeteccionBarras]:
         """Detección basada en análisis de proyecciones."""
         try:
-            alto, ancho = imagen.shape[:2]
+            # gris puede estar reducido (escala > 1): los análisis se hacen en
+            # sus dimensiones y las coordenadas se devuelven a la imagen original
+            alto, ancho = gris.shape[:2]
+            min_ancho = self.min_ancho / escala
+            min_alto = self.min_alto / escala
 
-            # Convertir a grises y mejorar contraste
-            gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-            gris = cv2.equalizeHist(gris)
-
-            # Proyección horizontal
-            proyeccion_h = np.sum(gris, axis=0) / alto
+            # Proyección horizontal como suma entera por columna. Sin ecualizar
+            # ni normalizar: los umbrales son relativos a la media y desviación
+            # de la propia señal
+            proyeccion_h = cv2.reduce(gris, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
 
             # Encontrar regiones con alta variación
-            variacion = np.convolve(
-                np.abs(np.gradient(proyeccion_h)), np.ones(20) / 20, mode="same"
-            )
+            # Media móvil de 20 px con el filtro de caja de OpenCV sobre la señal
+            # 1D (cv2.blur no admite int32; las sumas caben exactas en float32)
+            variacion = np.abs(np.diff(proyeccion_h, prepend=proyeccion_h[0]))
+            variacion = cv2.blur(
+                variacion.astype(np.float32).reshape(1, -1), (20, 1)
+            ).ravel()
 
             umbral_variacion = np.mean(variacion) + 2 * np.std(variacion)
             mascara_variacion = variacion > umbral_variacion
 
             # Encontrar segmentos continuos
-            segmentos = []
-            inicio = None
-            for i, val in enumerate(mascara_variacion):
-                if val and inicio is None:
-                    inicio = i
-                elif not val and inicio is not None:
-                    fin = i
-                    if fin - inicio > 50:
-                        segmentos.append((inicio, fin))
-                    inicio = None
+            segmentos = _segmentos_continuos(mascara_variacion, 50 / escala)
 
             # Evaluar segmentos
             for inicio_x, fin_x in segmentos:
                 w = fin_x - inicio_x
-                if w < self.min_ancho:
+                if w < min_ancho:
                     continue
 
                 # Buscar altura
-                segmento_imagen = imagen[:, inicio_x:fin_x]
-                segmento_gris = cv2.cvtColor(segmento_imagen, cv2.COLOR_BGR2GRAY)
+                segmento_gris = gris[:, inicio_x:fin_x]
 
-                # Proyección vertical
-                proyeccion_v = np.sum(segmento_gris, axis=1) / w
-                variacion_v = np.abs(np.gradient(proyeccion_v))
+                # Proyección vertical, todo en enteros. Para v entero, v > t
+                # equivale a v > floor(t), así que el umbral se trunca sin
+                # cambiar el resultado
+                proyeccion_v = cv2.reduce(
+                    segmento_gris, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S
+                ).ravel()
+                variacion_v = np.abs(np.diff(proyeccion_v, prepend=proyeccion_v[0]))
 
-                umbral_v = np.mean(variacion_v) + np.std(variacion_v)
+                umbral_v = int(variacion_v.mean() + variacion_v.std())
                 mascara_v = variacion_v > umbral_v
 
                 # Encontrar bloques verticales
-                bloques = []
-                bloque_inicio = None
-                for i, val in enumerate(mascara_v):
-                    if val and bloque_inicio is None:
-                        bloque_inicio = i
-                    elif not val and bloque_inicio is not None:
-                        bloque_fin = i
-                        if bloque_fin - bloque_inicio > 10:
-                            bloques.append((bloque_inicio, bloque_fin))
-                        bloque_inicio = None
+                bloques = _segmentos_continuos(mascara_v, 10 / escala)
 
                 if bloques:
                     bloque_inicio, bloque_fin = max(bloques, key=lambda b: b[1] - b[0])
                     y = bloque_inicio
                     h = bloque_fin - bloque_inicio
 
-                    if h >= self.min_alto:
+                    if h >= min_alto:
                         relacion = w / h
                         confianza = min(1.0, min(relacion, 10.0) / 10.0 * 0.7 + 0.3)
 
                         x = inicio_x
 
                         # 🔧 EXTENDER ROI 20% HACIA ABAJO
+                        x, y, w, h = x * escala, y * escala, w * escala, h * escala
                         coords_original = (x, y, w, h)
                         x_ext, y_ext, w_ext, h_ext = self._extender_roi_con_texto(
                             coords_original, imagen
@@ -430,24 +659,49 @@ class DetectorBarrasAutomatico:
 
         return None
 
-    def _detectar_con_contornos(self, imagen: np.ndarray) -> Optional[DeteccionBarras]:
+    def _detectar_con_contornos(
+        self, imagen: np.ndarray, gris: np.ndarray, escala: int = 1
+    ) -> Optional[DeteccionBarras]:
         """Detección basada en contornos y operaciones morfológicas."""
         try:
-            alto, ancho = imagen.shape[:2]
-
-            # Procesamiento para resaltar patrones lineales
-            gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-
-            # Realce de bordes
-            bordes = cv2.Canny(gris, 50, 150)
+            # gris puede estar reducido (escala > 1): los análisis se hacen en
+            # sus dimensiones y las coordenadas se devuelven a la imagen original
+            alto, ancho = gris.shape[:2]
+            min_ancho = self.min_ancho / escala
+            min_alto = self.min_alto / escala
+
+            # Realce de bordes. Basta una máscara de magnitud de gradiente
+            # (Scharr + umbral), sin la supresión de no máximos ni la histéresis
+            # de Canny, porque después se dilata en bloques
+            forma = gris.shape
+            grad_x = cv2.Scharr(
+                gris, cv2.CV_16S, 1, 0, dst=self._buffer("scharr_x", forma, np.int16)
+            )
+            grad_y = cv2.Scharr(
+                gris, cv2.CV_16S, 0, 1, dst=self._buffer("scharr_y", forma, np.int16)
+            )
+            bordes = cv2.add(
+                cv2.convertScaleAbs(grad_x, dst=self._buffer("bordes_x", forma)),
+                cv2.convertScaleAbs(grad_y, dst=self._buffer("bordes_y", forma)),
+                dst=self._buffer("bordes", forma),
+            )
+            cv2.threshold(bordes, 60, 255, cv2.THRESH_BINARY, dst=bordes)
 
             # Dilatación horizontal para unir bordes de barras
-            kernel_horiz = np.ones((1, 15), np.uint8)
-            dilatado = cv2.dilate(bordes, kernel_horiz, iterations=2)
+            dilatado = cv2.dilate(
+                bordes,
+                self._kern_dilate,
+                dst=self._buffer("dilatado", gris.shape),
+                iterations=2,
+            )
 
             # Cierre para formar bloques
-            kernel_rect = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 5))
-            cerrado = cv2.morphologyEx(dilatado, cv2.MORPH_CLOSE, kernel_rect)
+            cerrado = cv2.morphologyEx(
+                dilatado,
+                cv2.MORPH_CLOSE,
+                self._kern_rect,
+                dst=self._buffer("cerrado_contornos", gris.shape),
+            )
 
             # Encontrar contornos
             contornos, _ = cv2.findContours(
@@ -461,7 +715,7 @@ class DetectorBarrasAutomatico:
                 x, y, w, h = cv2.boundingRect(contorno)
 
                 # Filtros básicos
-                if w < self.min_ancho or h < self.min_alto:
+                if w < min_ancho or h < min_alto:
                     continue
 
                 if w > ancho * 0.7:  # No toda la imagen
@@ -492,6 +746,7 @@ class DetectorBarrasAutomatico:
                 x, y, w, h, confianza = mejor_contorno
 
                 # 🔧 EXTENDER ROI 20% HACIA ABAJO
+                x, y, w, h = x * escala, y * escala, w * escala, h * escala
                 coords_original = (x, y, w, h)
                 x_ext, y_ext, w_ext, h_ext = self._extender_roi_con_texto(
                     coords_original, imagen
@@ -582,23 +837,32 @@ class DetectorBarrasAutomatico:
         """
         inicio = time.time()
 
-        # ESTRATEGIA 1: pyzbar directo (más rápido)
+        # ESTRATEGIA 1: pyzbar directo (más rápido), con sondeo a media resolución
         try:
-            deteccion = self._detectar_con_pyzbar(imagen)
+            deteccion = self._detectar_con_pyzbar(imagen, sondeo=True)
             if deteccion:
                 deteccion.tiempo_ms = (time.time() - inicio) * 1000
                 return deteccion
         except:
             pass
 
-        # ESTRATEGIA 2: Gradientes (segunda opción más rápida)
-        deteccion = self._detectar_con_gradientes(imagen)
+        # ESTRATEGIA 2: Gradientes (segunda opción más rápida), salvo en
+        # imágenes sin contraste
+        gris, escala = self._preparar_gris(imagen)
+        if self._contraste_plano(gris):
+            return None
+        deteccion = self._detectar_con_gradientes(imagen, gris, escala)
         if deteccion and deteccion.confianza >= 0.3:  # Umbral más bajo
             deteccion.tiempo_ms = (time.time() - inicio) * 1000
             return deteccion
 
         return None
 
+    def cerrar(self) -> None:
+        """Detiene los hilos de las estrategias en paralelo."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._en_curso = []
+
 
 # ============================================================================
 # TEST ESPECÍFICO DE EXTENSIÓN ROI
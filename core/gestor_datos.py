@@ -1,9 +1,16 @@
 # core/gestor_datos.py - COMPLETO CON COMPORTAMIENTO CORREGIDO
 
+import atexit
+import functools
 import json
+import mmap
 import shutil
 import re
-from datetime import datetime
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Tuple, List
 from pathlib import Path
 import cv2
@@ -18,6 +25,196 @@ from utils.logger import obtener_logger
 from utils.excepciones import ErrorGuardadoDatos
 from config import config
 
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# Flags de apertura de los archivos de salida (O_BINARY solo existe en Windows).
+# Lectura/escritura: mmap exige poder leer el descriptor
+_O_BINARIO = getattr(os, "O_BINARY", 0)
+_FLAGS_CREAR_NUEVO = os.O_RDWR | os.O_CREAT | os.O_EXCL | _O_BINARIO
+_FLAGS_SOBREESCRIBIR = os.O_RDWR | os.O_CREAT | os.O_TRUNC | _O_BINARIO
+_O_TMPFILE = getattr(os, "O_TMPFILE", 0)  # Solo Linux
+_O_DIRECTORIO = getattr(os, "O_DIRECTORY", 0)  # No existe en Windows
+
+# Nombre de directorio con el formato de fecha por defecto (%Y-%m-%d)
+_PATRON_FECHA_ISO = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Caracteres no válidos en nombres de carpeta en los sistemas de archivos comunes
+_CARACTERES_INVALIDOS = re.compile(r'[<>:"/\\|?*\x00-\x1F]')
+
+# Longitud máxima de un nombre de carpeta (evita problemas en algunos sistemas)
+_LONGITUD_MAXIMA_CARPETA = 255
+
+# Índice máximo de los directorios de un mismo código (codigo_1 ... codigo_1000)
+_MAXIMO_INDICE_DIRECTORIO = 1000
+
+# Vigencia de la medición de espacio libre por dispositivo; entre boletos
+# consecutivos apenas cambia
+_TTL_ESPACIO_DISCO_S = 60.0
+
+# A partir de este tamaño las imágenes codificadas se escriben mediante mmap;
+# por debajo, una escritura directa es más rápida
+_UMBRAL_MMAP = 1 << 20
+_MADV_SECUENCIAL = getattr(mmap, "MADV_SEQUENTIAL", None)  # No existe en Windows
+
+
+def _serializar_json(datos: Dict[str, Any]) -> bytes:
+    """
+    Serializa datos a JSON legible (sangría de 2, UTF-8 sin escapar).
+
+    Args:
+        datos: Diccionario a serializar.
+
+    Returns:
+        Contenido JSON codificado en UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            datos,
+            option=orjson.OPT_INDENT_2
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(datos, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _serializar_linea_json(datos: Dict[str, Any]) -> bytes:
+    """
+    Serializa datos a una línea JSON compacta terminada en salto de línea.
+
+    Args:
+        datos: Diccionario a serializar.
+
+    Returns:
+        Línea NDJSON codificada en UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            datos,
+            option=orjson.OPT_APPEND_NEWLINE
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    linea = json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+    return (linea + "\n").encode("utf-8")
+
+
+def _escribir_buffer(fd: int, buffer: np.ndarray, sincronizar: bool = False) -> None:
+    """
+    Escribe un buffer codificado en un archivo recién abierto y lo cierra.
+
+    Los buffers grandes se copian directamente a las páginas del archivo
+    mapeado en memoria, sin pasar por el buffer de escritura de Python.
+
+    Args:
+        fd: Descriptor abierto en lectura/escritura; se cierra siempre.
+        buffer: Contenido ya codificado (resultado de cv2.imencode).
+        sincronizar: Si es True, fsync del contenido antes de cerrar.
+    """
+    with os.fdopen(fd, "wb") as f:
+        tamaño = buffer.nbytes
+        if tamaño < _UMBRAL_MMAP:
+            f.write(buffer)
+            f.flush()
+        else:
+            os.ftruncate(fd, tamaño)
+            with mmap.mmap(fd, tamaño) as mapa:
+                if _MADV_SECUENCIAL is not None:
+                    mapa.madvise(_MADV_SECUENCIAL)
+                mapa.write(buffer)
+        if sincronizar:
+            os.fsync(fd)
+
+
+def _enlazar_anonimo(fd: int, ruta: str) -> None:
+    """
+    Da nombre a un archivo anónimo O_TMPFILE.
+
+    link(2) no sigue el enlace mágico /proc/self/fd/N y falla con EXDEV: hace
+    falta linkat con AT_SYMLINK_FOLLOW, que os.link solo usa cuando recibe un
+    descriptor de directorio.
+
+    Args:
+        fd: Descriptor del archivo anónimo.
+        ruta: Nombre que se le da.
+
+    Raises:
+        FileExistsError: Si el nombre ya está ocupado.
+        OSError: Si el sistema no permite enlazarlo (sin /proc, EPERM...).
+    """
+    fd_proc = os.open("/proc/self/fd", os.O_RDONLY | _O_DIRECTORIO)
+    try:
+        os.link(str(fd), ruta, src_dir_fd=fd_proc, follow_symlinks=True)
+    finally:
+        os.close(fd_proc)
+
+
+def _sincronizar_directorio(ruta_directorio: str) -> None:
+    """
+    Hace persistentes las entradas de un directorio (archivos creados en él).
+
+    No hace nada donde no se pueden abrir directorios (Windows).
+
+    Args:
+        ruta_directorio: Directorio a sincronizar.
+    """
+    if not _O_DIRECTORIO:
+        return
+    fd = os.open(ruta_directorio, os.O_RDONLY | _O_DIRECTORIO)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sanitizar_nombre(nombre: str, caracter_reemplazo: str) -> str:
+    """
+    Reemplaza los caracteres no válidos de un nombre de carpeta y lo recorta.
+
+    Cacheada: un mismo código se sanitiza varias veces por captura.
+
+    Args:
+        nombre: Nombre original.
+        caracter_reemplazo: Texto que sustituye a cada carácter no válido.
+
+    Returns:
+        Nombre sanitizado.
+    """
+    nombre_sanitizado = _CARACTERES_INVALIDOS.sub(caracter_reemplazo, nombre)
+    return nombre_sanitizado[:_LONGITUD_MAXIMA_CARPETA]
+
+
+# Gestores sin cerrar. Referencias débiles: un gestor que se suelta sin llamar
+# a cerrar se libera igualmente; los que siguen vivos se cierran al salir
+_GESTORES_ABIERTOS: "weakref.WeakSet[GestorDatos]" = weakref.WeakSet()
+
+
+@atexit.register
+def _cerrar_gestores_abiertos() -> None:
+    """Cierra al salir del intérprete los gestores que siguen abiertos."""
+    for gestor in list(_GESTORES_ABIERTOS):
+        gestor.cerrar()
+
+
+def _eliminar_arbol(ruta: str) -> bool:
+    """
+    Elimina un directorio y su contenido.
+
+    Args:
+        ruta: Directorio a eliminar.
+
+    Returns:
+        True si se eliminó, False si falló.
+    """
+    try:
+        shutil.rmtree(ruta)
+        return True
+    except OSError:
+        return False
+
 
 class GestorDatos:
     """
@@ -67,11 +264,40 @@ class GestorDatos:
         self._directorio_actual: Optional[str] = None
         self._timestamp_actual: Optional[str] = None
         self._codigo_actual: Optional[str] = None
+        self._fecha_boleto: Optional[str] = None  # YYYY-MM-DD del boleto actual
+        self._nombres_boleto: Dict[str, str] = {}  # tipo -> nombre sin extensión
+        self._prefijo_directorio = ""  # _directorio_actual con separador final
+        self._prefijo_base = ""  # ruta_base con separador final
+        self._directorio_dia: Optional[str] = None  # Último directorio por fecha
+
+        # Metadatos vía O_TMPFILE + enlace; se desactiva si el enlace falla
+        self._usar_tmpfile = bool(_O_TMPFILE)
+
+        # Siguiente secuencia libre por ruta de archivo (ver _construir_nombre_archivo)
+        self._secuencia_siguiente: Dict[str, int] = {}
 
-        # Estadísticas
+        # Registro NDJSON de metadatos del día (archivos.metadatos_ndjson)
+        self._fd_registro_metadatos: Optional[int] = None
+        self._ruta_registro_metadatos: Optional[str] = None
+
+        # Espacio libre por dispositivo: st_dev -> (instante de caducidad, MB)
+        self._cache_espacio_disco: Dict[int, Tuple[float, float]] = {}
+
+        # Estadísticas (protegidas por lock: las imágenes se guardan en paralelo)
         self._archivos_guardados = 0
         self._bytes_guardados = 0
         self._errores_guardado = 0
+        self._lock_estadisticas = threading.Lock()
+
+        # Hilos para codificar y escribir las imágenes de un boleto en paralelo
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=3, thread_name_prefix="gestor_datos"
+        )
+
+        # Cierre explícito (cerrar) o, como último recurso, al salir del
+        # intérprete mientras el logging sigue disponible
+        self._cerrado = False
+        _GESTORES_ABIERTOS.add(self)
 
         self.logger.info("GestorDatos inicializado")
 
@@ -88,18 +314,7 @@ class GestorDatos:
         if not self.config.archivos.sanitizar_nombre_carpeta:
             return nombre
 
-        # Reemplazar caracteres no válidos para sistemas de archivos
-        caracteres_invalidos = r'[<>:"/\\|?*\x00-\x1F]'
-        caracter_reemplazo = self.config.archivos.caracteres_reemplazo
-
-        nombre_sanitizado = re.sub(caracteres_invalidos, caracter_reemplazo, nombre)
-
-        # Limitar longitud (evitar problemas en algunos sistemas de archivos)
-        max_longitud = 255
-        if len(nombre_sanitizado) > max_longitud:
-            nombre_sanitizado = nombre_sanitizado[:max_longitud]
-
-        return nombre_sanitizado
+        return _sanitizar_nombre(nombre, self.config.archivos.caracteres_reemplazo)
 
     def _directorio_tiene_archivos(self, ruta_directorio: str) -> bool:
         """
@@ -112,30 +327,22 @@ class GestorDatos:
             True si el directorio tiene archivos, False si está vacío.
         """
         try:
-            if not os.path.exists(ruta_directorio):
-                return False
-
-            # Listar archivos (no directorios)
-            contenido = []
-            for item in os.listdir(ruta_directorio):
-                item_path = os.path.join(ruta_directorio, item)
-                if os.path.isfile(item_path):
-                    # Ignorar archivos ocultos y de sistema
-                    if not item.startswith("."):
-                        # Verificar que no sean archivos vacíos o de 0 bytes
-                        if os.path.getsize(item_path) > 0:
-                            contenido.append(item)
-
-            # También considerar subdirectorios no vacíos
-            for item in os.listdir(ruta_directorio):
-                item_path = os.path.join(ruta_directorio, item)
-                if os.path.isdir(item_path):
-                    # Verificar si el subdirectorio tiene contenido
-                    if self._directorio_tiene_archivos(item_path):
-                        contenido.append(item)
-
-            return len(contenido) > 0
+            # Una sola pasada: el tipo de cada entrada viene de readdir y se
+            # termina en el primer archivo con contenido
+            with os.scandir(ruta_directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file(follow_symlinks=False):
+                        # Ignorar archivos ocultos y de sistema, y los de 0 bytes
+                        if not entrada.name.startswith(".") and entrada.stat().st_size:
+                            return True
+                    elif entrada.is_dir(follow_symlinks=False):
+                        # También considerar subdirectorios no vacíos
+                        if self._directorio_tiene_archivos(entrada.path):
+                            return True
+            return False
 
+        except FileNotFoundError:
+            return False
         except Exception as e:
             self.logger.warning(
                 f"Error al verificar contenido de directorio {ruta_directorio}: {e}"
@@ -195,7 +402,7 @@ class GestorDatos:
                 except Exception as e:
                     self.logger.warning(f"No se pudo eliminar {item_path}: {e}")
 
-            self.logger.debug(f"Directorio limpiado: {ruta_directorio}")
+            self.logger.debug("Directorio limpiado: %s", ruta_directorio)
         except Exception as e:
             self.logger.error(f"Error al limpiar directorio {ruta_directorio}: {e}")
 
@@ -221,44 +428,60 @@ class GestorDatos:
         # Directorio base existe, verificar si está vacío
         if not self._directorio_tiene_archivos(ruta_directorio):
             # Directorio base existe pero está vacío, reutilizarlo
-            self.logger.debug(f"Reutilizando directorio vacío: {ruta_directorio}")
+            self.logger.debug("Reutilizando directorio vacío: %s", ruta_directorio)
             return ruta_directorio
 
-        # Directorio base existe y tiene archivos, buscar con índice
-        indice = 1
-        while True:
-            ruta_alternativa = f"{ruta_directorio}_{indice}"
+        # Directorio base existe y tiene archivos, buscar con índice. Los
+        # índices se crean consecutivos: búsqueda exponencial del primero libre
+        # y binaria en el último tramo, O(log N) comprobaciones en vez de N
+        def existe(indice: int) -> bool:
+            return os.path.exists(f"{ruta_directorio}_{indice}")
+
+        alto = 1
+        while alto <= _MAXIMO_INDICE_DIRECTORIO and existe(alto):
+            alto *= 2
+        bajo = alto // 2  # Último índice que existe (0 = directorio base)
+        while alto - bajo > 1:
+            medio = (bajo + alto) // 2
+            if existe(medio):
+                bajo = medio
+            else:
+                alto = medio
 
-            if not os.path.exists(ruta_alternativa):
-                # Directorio con índice no existe, crearlo
-                self.logger.debug(
-                    f"Creando directorio con índice {indice}: {ruta_alternativa}"
-                )
-                return ruta_alternativa
-            elif os.path.exists(
-                ruta_alternativa
-            ) and not self._directorio_tiene_archivos(ruta_alternativa):
-                # Directorio con índice existe pero está vacío, reutilizarlo
+        # El último directorio con índice pudo quedar vacío: reutilizarlo
+        if bajo > 0:
+            ruta_alternativa = f"{ruta_directorio}_{bajo}"
+            if not self._directorio_tiene_archivos(ruta_alternativa):
                 self.logger.debug(
-                    f"Reutilizando directorio vacío con índice {indice}: {ruta_alternativa}"
+                    "Reutilizando directorio vacío con índice %d: %s",
+                    bajo,
+                    ruta_alternativa,
                 )
                 return ruta_alternativa
 
-            indice += 1
+        # Límite de seguridad
+        if alto > _MAXIMO_INDICE_DIRECTORIO:
+            raise ErrorGuardadoDatos(
+                f"Demasiadas carpetas con el código: {nombre_base}"
+            )
 
-            # Límite de seguridad
-            if indice > 1000:
-                raise ErrorGuardadoDatos(
-                    f"Demasiadas carpetas con el código: {nombre_base}"
-                )
+        ruta_alternativa = f"{ruta_directorio}_{alto}"
+        self.logger.debug(
+            "Creando directorio con índice %d: %s", alto, ruta_alternativa
+        )
+        return ruta_alternativa
 
-    def preparar_directorio(self, codigo_barras: str = None) -> str:
+    def preparar_directorio(
+        self, codigo_barras: str = None, ahora: Optional[datetime] = None
+    ) -> str:
         """
         Prepara el directorio para guardar archivos.
 
         Args:
             codigo_barras: Código de barras para organizar por código.
                           Si es None, usa estructura por fecha.
+            ahora: Instante de la captura para la estructura por fecha. Si es
+                None, el actual.
 
         Returns:
             Ruta completa del directorio creado/preparado.
@@ -267,23 +490,30 @@ class GestorDatos:
             ErrorGuardadoDatos: Si no se puede crear el directorio.
         """
         try:
-            estructura = self.config.archivos.estructura_directorios
+            archivos = self.config.archivos
+            estructura = archivos.estructura_directorios
 
             # Construir ruta base
-            ruta_base = self.config.archivos.ruta_base
+            ruta_base = archivos.ruta_base
 
+            es_directorio_dia = False
             if estructura == "codigo" and codigo_barras:
                 # Organizar por código de barras
                 ruta_directorio = self._obtener_ruta_directorio_codigo(codigo_barras)
 
             elif estructura == "fecha" or codigo_barras is None:
                 # Organizar por fecha (comportamiento original)
-                fecha_actual = datetime.now()
-                nombre_directorio = fecha_actual.strftime(
-                    self.config.archivos.formato_fecha
-                )
+                fecha_actual = ahora or datetime.now()
+                nombre_directorio = fecha_actual.strftime(archivos.formato_fecha)
                 ruta_directorio = os.path.join(ruta_base, nombre_directorio)
 
+                # Mismo día que la última preparación: el directorio ya se creó
+                # y se comprobaron permisos y espacio
+                if ruta_directorio == self._directorio_dia:
+                    self._fijar_directorio_actual(ruta_directorio, ruta_base)
+                    return ruta_directorio
+                es_directorio_dia = True
+
             else:
                 # Sin estructura - todos en la misma carpeta
                 ruta_directorio = ruta_base
@@ -301,11 +531,13 @@ class GestorDatos:
             if self._verificar_espacio_disco(ruta_directorio) < 100:
                 self.logger.warning(f"Poco espacio en disco para {ruta_directorio}")
 
-            self._directorio_actual = ruta_directorio
+            self._fijar_directorio_actual(ruta_directorio, ruta_base)
+            if es_directorio_dia:
+                self._directorio_dia = ruta_directorio
 
             modo = (
                 "SEGURO (evitar_sobreescritura=true)"
-                if self.config.archivos.evitar_sobreescritura
+                if archivos.evitar_sobreescritura
                 else "SOBREESCRITURA (evitar_sobreescritura=false)"
             )
             self.logger.info(
@@ -318,6 +550,21 @@ class GestorDatos:
         except Exception as e:
             raise ErrorGuardadoDatos(f"Error al preparar directorio: {e}")
 
+    def _fijar_directorio_actual(self, ruta_directorio: str, ruta_base: str) -> None:
+        """
+        Establece el directorio de trabajo y sus prefijos de ruta.
+
+        Los prefijos son fijos mientras dure el directorio: las rutas de los
+        archivos se concatenan y recortan en vez de usar join/relpath.
+
+        Args:
+            ruta_directorio: Directorio ya preparado.
+            ruta_base: Ruta base configurada.
+        """
+        self._directorio_actual = ruta_directorio
+        self._prefijo_directorio = os.path.join(ruta_directorio, "")
+        self._prefijo_base = os.path.join(ruta_base, "")
+
     def _verificar_espacio_disco(self, ruta: str, mb_minimo: float = 100) -> float:
         """
         Verifica el espacio disponible en disco.
@@ -330,9 +577,20 @@ class GestorDatos:
             MB disponibles.
         """
         try:
-            # Obtener estadísticas del disco
-            stat = shutil.disk_usage(ruta)
-            mb_disponibles = stat.free / (1024 * 1024)  # Bytes a MB
+            # Obtener estadísticas del disco, reutilizando la medición reciente
+            # del mismo dispositivo
+            dispositivo = os.stat(ruta).st_dev
+            ahora = time.monotonic()
+            en_cache = self._cache_espacio_disco.get(dispositivo)
+            if en_cache is not None and en_cache[0] > ahora:
+                mb_disponibles = en_cache[1]
+            else:
+                stat = shutil.disk_usage(ruta)
+                mb_disponibles = stat.free / (1024 * 1024)  # Bytes a MB
+                self._cache_espacio_disco[dispositivo] = (
+                    ahora + _TTL_ESPACIO_DISCO_S,
+                    mb_disponibles,
+                )
 
             if mb_disponibles < mb_minimo:
                 self.logger.warning(
@@ -352,8 +610,24 @@ class GestorDatos:
         Args:
             codigo_barras: Código de barras del boleto.
         """
+        ahora = datetime.now()
         self._codigo_actual = codigo_barras
-        self._timestamp_actual = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._timestamp_actual = ahora.strftime("%Y%m%d_%H%M%S_%f")
+
+        # Código, timestamp y fecha son fijos en todo el boleto: los nombres de
+        # cada tipo de archivo se resuelven una sola vez
+        archivos = self.config.archivos
+        self._fecha_boleto = ahora.strftime("%Y-%m-%d")
+        self._nombres_boleto = {
+            tipo: self._resolver_patron(patron, tipo, self._fecha_boleto)
+            for tipo, patron in (
+                ("frente", archivos.nombre_frente),
+                ("reverso", archivos.nombre_reverso),
+                ("roi", archivos.nombre_roi),
+                ("metadata", archivos.nombre_metadata),
+                ("fallida", archivos.nombre_fallida),
+            )
+        }
 
         # Determinar si debemos reutilizar el directorio actual
         reutilizar_directorio = False
@@ -368,36 +642,67 @@ class GestorDatos:
                 or directorio_actual_base.startswith(f"{nombre_carpeta}_")
             ):
                 # Solo reutilizar si evitar_sobreescritura está DESACTIVADO
-                if not self.config.archivos.evitar_sobreescritura:
+                if not archivos.evitar_sobreescritura:
                     reutilizar_directorio = True
                     self.logger.debug(
-                        f"Reutilizando directorio (evitar_sobreescritura=false): {self._directorio_actual}"
+                        "Reutilizando directorio (evitar_sobreescritura=false): %s",
+                        self._directorio_actual,
                     )
                 else:
                     self.logger.debug(
-                        f"No reutilizando directorio (evitar_sobreescritura=true): {self._directorio_actual}"
+                        "No reutilizando directorio (evitar_sobreescritura=true): %s",
+                        self._directorio_actual,
                     )
                     self._directorio_actual = None
 
         if not reutilizar_directorio:
             # No hay directorio reutilizable, crear uno nuevo
-            self.preparar_directorio(codigo_barras)
+            self.preparar_directorio(codigo_barras, ahora)
 
         self.logger.info(f"Iniciando captura para boleto: {codigo_barras}")
 
+    def _resolver_patron(self, patron: str, tipo: str, fecha: str) -> str:
+        """
+        Sustituye las variables de un patrón de nombre de archivo.
+
+        Args:
+            patron: Patrón configurado.
+            tipo: Tipo de archivo.
+            fecha: Fecha en formato YYYY-MM-DD.
+
+        Returns:
+            Nombre sin extensión.
+        """
+        nombre = patron.replace("{tipo}", tipo)
+        nombre = nombre.replace("{codigo}", self._codigo_actual)
+        nombre = nombre.replace("{timestamp}", self._timestamp_actual)
+        return nombre.replace("{fecha}", fecha)
+
     def _construir_nombre_archivo(
-        self, tipo: str, extension: Optional[str] = None
-    ) -> str:
+        self,
+        tipo: str,
+        extension: Optional[str] = None,
+        fd_anonimo: Optional[int] = None,
+    ) -> Tuple[str, int]:
         """
-        Construye un nombre de archivo único y descriptivo.
+        Construye un nombre de archivo único y descriptivo y crea el archivo.
+
+        Con evitar_sobreescritura el nombre se reserva abriendo con
+        O_CREAT | O_EXCL: la colisión la detecta el propio open (un syscall por
+        intento, sin carrera entre comprobar y escribir) y se prueba el
+        siguiente sufijo. Sin evitar_sobreescritura se trunca el existente.
 
         Args:
             tipo: Tipo de archivo (frente, reverso, roi, metadata).
             extension: Extensión del archivo. Si es None, usa la configurada.
+            fd_anonimo: Archivo O_TMPFILE ya escrito que, en vez de crear uno
+                nuevo, se enlaza con el nombre libre (solo con
+                evitar_sobreescritura).
 
         Returns:
-            Nombre del archivo.
+            Tupla (nombre del archivo, descriptor abierto para escritura).
         """
+        archivos = self.config.archivos
         if self._codigo_actual is None or self._timestamp_actual is None:
             raise ErrorGuardadoDatos("No se ha iniciado una captura de boleto")
 
@@ -406,57 +711,54 @@ class GestorDatos:
             if tipo == "metadata":
                 extension = "json"
             else:
-                extension = self.config.archivos.formato_imagen
-
-        # Construir patrón según configuración
-        patrones = {
-            "frente": self.config.archivos.nombre_frente,
-            "reverso": self.config.archivos.nombre_reverso,
-            "roi": self.config.archivos.nombre_roi,
-            "metadata": self.config.archivos.nombre_metadata,
-            "fallida": self.config.archivos.nombre_fallida,
-        }
+                extension = archivos.formato_imagen
 
-        if tipo not in patrones:
+        # Nombre resuelto en iniciar_captura_boleto
+        nombre = self._nombres_boleto.get(tipo)
+        if nombre is None:
             self.logger.warning(
                 f"Tipo de archivo desconocido: {tipo}. Usando patrón por defecto."
             )
-            patron = f"{tipo}_{{codigo}}_{{timestamp}}"
-        else:
-            patron = patrones[tipo]
-
-        # Reemplazar variables en el patrón
-        nombre = patron.replace("{tipo}", tipo)
-        nombre = nombre.replace("{codigo}", self._codigo_actual)
-        nombre = nombre.replace("{timestamp}", self._timestamp_actual)
-        nombre = nombre.replace("{fecha}", datetime.now().strftime("%Y-%m-%d"))
+            nombre = self._resolver_patron(
+                f"{tipo}_{{codigo}}_{{timestamp}}", tipo, self._fecha_boleto
+            )
 
         # Añadir secuencia si hay colisiones (solo si evitar_sobreescritura=true)
-        if self.config.archivos.evitar_sobreescritura:
-            nombre_base = nombre
-            contador = 1
-
-            while True:
+        # Se empieza por la secuencia que siguió a la última colisión de este
+        # nombre, para no volver a probar los que ya se sabe que existen
+        if archivos.evitar_sobreescritura:
+            clave = f"{self._prefijo_directorio}{nombre}.{extension}"
+            contador = self._secuencia_siguiente.get(clave, 0)
+
+            for _ in range(100):  # Límite de seguridad
+                nombre_base = f"{nombre}_{contador}" if contador else nombre
                 nombre_completo = f"{nombre_base}.{extension}"
-                ruta_completa = os.path.join(self._directorio_actual, nombre_completo)
+                ruta_completa = self._prefijo_directorio + nombre_completo
 
-                if not os.path.exists(ruta_completa):
-                    break
+                try:
+                    if fd_anonimo is None:
+                        fd = os.open(ruta_completa, _FLAGS_CREAR_NUEVO, 0o644)
+                    else:
+                        # El enlace también falla con EEXIST si el nombre está
+                        # ocupado
+                        _enlazar_anonimo(fd_anonimo, ruta_completa)
+                        fd = fd_anonimo
+                except FileExistsError:
+                    # Añadir número de secuencia
+                    contador += 1
+                    continue
 
-                # Añadir número de secuencia
-                nombre_base = f"{nombre}_{contador}"
-                contador += 1
+                self._secuencia_siguiente[clave] = contador + 1
+                return nombre_completo, fd
 
-                if contador > 100:  # Límite de seguridad
-                    raise ErrorGuardadoDatos(
-                        "Demasiadas colisiones de nombres de archivo"
-                    )
+            raise ErrorGuardadoDatos("Demasiadas colisiones de nombres de archivo")
         else:
             # Si evitar_sobreescritura=false, no verificar colisiones
             # simplemente usar el nombre (sobreescribirá si existe)
             nombre_completo = f"{nombre}.{extension}"
-
-        return nombre_completo
+            ruta_completa = self._prefijo_directorio + nombre_completo
+            fd = os.open(ruta_completa, _FLAGS_SOBREESCRIBIR, 0o644)
+            return nombre_completo, fd
 
     def guardar_imagen(
         self, imagen: np.ndarray, tipo: str, calidad: Optional[int] = None
@@ -467,7 +769,7 @@ class GestorDatos:
         Args:
             imagen: Imagen a guardar (numpy array).
             tipo: Tipo de imagen (frente, reverso, roi).
-            calidad: Calidad para JPEG (1-100). Si es None, usa la configurada.
+            calidad: Calidad para JPEG o WebP (1-100). Si es None, usa la configurada.
 
         Returns:
             Ruta relativa del archivo guardado.
@@ -476,6 +778,7 @@ class GestorDatos:
             ErrorGuardadoDatos: Si no se puede guardar la imagen.
         """
         try:
+            archivos = self.config.archivos
             if self._directorio_actual is None:
                 raise ErrorGuardadoDatos("Directorio no preparado")
 
@@ -484,59 +787,67 @@ class GestorDatos:
                 raise ErrorGuardadoDatos("Imagen vacía o nula")
 
             # Determinar formato y parámetros
-            formato = self.config.archivos.formato_imagen.upper()
+            formato = archivos.formato_imagen.upper()
             if calidad is None:
-                calidad = self.config.archivos.calidad_jpg
-
-            # Construir nombre de archivo
-            nombre_archivo = self._construir_nombre_archivo(tipo, formato.lower())
-            ruta_completa = os.path.join(self._directorio_actual, nombre_archivo)
+                calidad = archivos.calidad_jpg
 
             # Parámetros de guardado según formato
             params = []
             if formato == "JPG" or formato == "JPEG":
+                # Las imágenes en escala de grises se codifican como JPEG de un
+                # solo canal, sin convertirlas a BGR
                 params = [cv2.IMWRITE_JPEG_QUALITY, calidad]
-                if len(imagen.shape) == 2:  # Escala de grises
-                    # JPEG requiere 3 canales para color
-                    imagen = cv2.cvtColor(imagen, cv2.COLOR_GRAY2BGR)
             elif formato == "PNG":
-                params = [cv2.IMWRITE_PNG_COMPRESSION, 9]  # Máxima compresión
+                params = [
+                    cv2.IMWRITE_PNG_COMPRESSION,
+                    # Clave nueva: puede faltar en configuraciones antiguas
+                    getattr(archivos, "compresion_png", 3),
+                ]
+            elif formato == "WEBP":
+                # Misma escala de calidad (1-100) que JPEG
+                params = [cv2.IMWRITE_WEBP_QUALITY, calidad]
             else:
                 raise ErrorGuardadoDatos(f"Formato no soportado: {formato}")
 
-            # Guardar imagen (sobreescribirá si existe y evitar_sobreescritura=false)
-            exito = cv2.imwrite(ruta_completa, imagen, params)
-
+            # Codificar antes de crear el archivo: si falla no queda nada en disco
+            exito, buffer = cv2.imencode(f".{formato.lower()}", imagen, params)
             if not exito:
-                raise ErrorGuardadoDatos(f"Error al guardar imagen: {ruta_completa}")
+                raise ErrorGuardadoDatos(f"Error al codificar imagen de tipo '{tipo}'")
+
+            # Crear el archivo y escribir por el descriptor ya abierto
+            # (sobreescribirá si existe y evitar_sobreescritura=false)
+            nombre_archivo, fd = self._construir_nombre_archivo(tipo, formato.lower())
+            ruta_completa = self._prefijo_directorio + nombre_archivo
+            _escribir_buffer(
+                fd, buffer, getattr(archivos, "durabilidad_estricta", False)
+            )
 
             # Actualizar estadísticas
-            tamaño_bytes = os.path.getsize(ruta_completa)
-            self._archivos_guardados += 1
-            self._bytes_guardados += tamaño_bytes
+            tamaño_bytes = buffer.nbytes
+            self._registrar_archivo(tamaño_bytes)
 
-            modo = "sobreescrito" if os.path.exists(ruta_completa) else "creado"
+            # Con evitar_sobreescritura el archivo se creó con O_EXCL: es nuevo
+            modo = "creado" if archivos.evitar_sobreescritura else "sobreescrito"
             self.logger.debug(
-                f"Imagen {modo}: {nombre_archivo} ({tamaño_bytes / 1024:.1f} KB)"
+                "Imagen %s: %s (%.1f KB)", modo, nombre_archivo, tamaño_bytes / 1024
             )
 
             # Devolver ruta relativa desde la base
-            ruta_relativa = os.path.relpath(
-                ruta_completa, self.config.archivos.ruta_base
-            )
-
-            return ruta_relativa
+            return self._ruta_relativa(ruta_completa)
 
         except Exception as e:
-            self._errores_guardado += 1
+            self._registrar_error()
             raise ErrorGuardadoDatos(f"Error al guardar imagen de tipo '{tipo}': {e}")
 
-    def guardar_metadatos(self, datos_boleto: Dict[str, Any]) -> str:
+    def guardar_metadatos(
+        self, datos_boleto: Dict[str, Any], fecha_iso: Optional[str] = None
+    ) -> str:
         """
         Guarda los metadatos de un boleto en formato JSON.
 
         Args:
             datos_boleto: Diccionario con los metadatos del boleto.
+            fecha_iso: Fecha de guardado en ISO 8601. Si es None, la actual.
 
         Returns:
             Ruta relativa del archivo JSON guardado.
@@ -545,6 +856,7 @@ class GestorDatos:
             ErrorGuardadoDatos: Si no se puede guardar el JSON.
         """
         try:
+            archivos = self.config.archivos
             if self._directorio_actual is None:
                 raise ErrorGuardadoDatos("Directorio no preparado")
 
@@ -553,51 +865,140 @@ class GestorDatos:
                 raise ErrorGuardadoDatos("Falta código de barras en metadatos")
 
             # Asegurar que tenemos timestamp
+            if fecha_iso is None:
+                fecha_iso = datetime.now().isoformat()
             if "fecha_captura" not in datos_boleto:
-                datos_boleto["fecha_captura"] = datetime.now().isoformat()
+                datos_boleto["fecha_captura"] = fecha_iso
 
             # Añadir información del sistema
             datos_boleto["version_sistema"] = "1.0.0"
-            datos_boleto["fecha_guardado"] = datetime.now().isoformat()
-            datos_boleto["estructura_organizacion"] = (
-                self.config.archivos.estructura_directorios
-            )
+            datos_boleto["fecha_guardado"] = fecha_iso
+            datos_boleto["estructura_organizacion"] = archivos.estructura_directorios
             datos_boleto["directorio_codigo"] = os.path.basename(
                 self._directorio_actual
             )
-            datos_boleto["evitar_sobreescritura"] = (
-                self.config.archivos.evitar_sobreescritura
-            )
-
-            # Construir nombre de archivo
-            nombre_archivo = self._construir_nombre_archivo("metadata", "json")
-            ruta_completa = os.path.join(self._directorio_actual, nombre_archivo)
-
-            # Guardar JSON con formato legible
-            with open(ruta_completa, "w", encoding="utf-8") as f:
-                json.dump(datos_boleto, f, ensure_ascii=False, indent=2)
+            datos_boleto["evitar_sobreescritura"] = archivos.evitar_sobreescritura
+
+            if getattr(archivos, "metadatos_ndjson", False):
+                # Una línea por boleto en el registro del día, en ruta_base
+                contenido = _serializar_linea_json(datos_boleto)
+                nombre_archivo = self._anexar_registro_metadatos(contenido, fecha_iso)
+                ruta_completa = self._prefijo_base + nombre_archivo
+                modo = "anexados"
+            else:
+                # Guardar JSON con formato legible en una sola escritura
+                contenido = _serializar_json(datos_boleto)
+                nombre_archivo = self._escribir_metadatos(contenido)
+                ruta_completa = self._prefijo_directorio + nombre_archivo
+                # Con evitar_sobreescritura el archivo se creó con O_EXCL: es nuevo
+                modo = "creado" if archivos.evitar_sobreescritura else "sobreescrito"
 
             # Actualizar estadísticas
-            tamaño_bytes = os.path.getsize(ruta_completa)
-            self._archivos_guardados += 1
-            self._bytes_guardados += tamaño_bytes
+            tamaño_bytes = len(contenido)
+            self._registrar_archivo(tamaño_bytes)
 
-            modo = "sobreescrito" if os.path.exists(ruta_completa) else "creado"
             self.logger.debug(
-                f"Metadatos {modo}: {nombre_archivo} ({tamaño_bytes / 1024:.1f} KB)"
+                "Metadatos %s: %s (%.1f KB)", modo, nombre_archivo, tamaño_bytes / 1024
             )
 
             # Devolver ruta relativa
-            ruta_relativa = os.path.relpath(
-                ruta_completa, self.config.archivos.ruta_base
-            )
-
-            return ruta_relativa
+            return self._ruta_relativa(ruta_completa)
 
         except Exception as e:
-            self._errores_guardado += 1
+            self._registrar_error()
             raise ErrorGuardadoDatos(f"Error al guardar metadatos: {e}")
 
+    def _escribir_metadatos(self, contenido: bytes) -> str:
+        """
+        Escribe el JSON de metadatos en el directorio actual.
+
+        En Linux, con evitar_sobreescritura, el contenido se escribe y
+        sincroniza en un archivo anónimo (O_TMPFILE) que después se enlaza con
+        su nombre: el JSON aparece completo o no aparece, aunque el proceso
+        caiga a mitad. Si no hay O_TMPFILE o no se puede enlazar, se escribe
+        directamente.
+
+        Args:
+            contenido: JSON ya serializado.
+
+        Returns:
+            Nombre del archivo escrito.
+        """
+        archivos = self.config.archivos
+        fd = None
+        if self._usar_tmpfile and archivos.evitar_sobreescritura:
+            try:
+                fd = os.open(self._directorio_actual, os.O_WRONLY | _O_TMPFILE, 0o644)
+            except OSError:
+                fd = None  # Sistema de archivos sin soporte de O_TMPFILE
+
+        if fd is not None:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contenido)
+                f.flush()
+                os.fsync(fd)
+                try:
+                    nombre_archivo, _ = self._construir_nombre_archivo(
+                        "metadata", "json", fd_anonimo=fd
+                    )
+                    return nombre_archivo
+                except OSError as e:
+                    # No se puede enlazar (EXDEV, EPERM, /proc no montado):
+                    # escritura directa desde ahora
+                    self._usar_tmpfile = False
+                    self.logger.warning(
+                        "No se pudo enlazar archivo O_TMPFILE (%s); "
+                        "se escribirán los metadatos directamente",
+                        e,
+                    )
+
+        nombre_archivo, fd = self._construir_nombre_archivo("metadata", "json")
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+            if getattr(archivos, "durabilidad_estricta", False):
+                f.flush()
+                os.fsync(fd)
+        return nombre_archivo
+
+    def _anexar_registro_metadatos(self, linea: bytes, fecha_iso: str) -> str:
+        """
+        Añade una línea al registro NDJSON de metadatos del día.
+
+        El registro se abre una vez al día con O_APPEND: cada boleto cuesta
+        una sola escritura, sin crear archivos ni entradas de directorio.
+
+        Args:
+            linea: Línea NDJSON ya serializada.
+            fecha_iso: Fecha de guardado en ISO 8601; elige el registro del día.
+
+        Returns:
+            Nombre del registro dentro de ruta_base.
+        """
+        nombre_archivo = f"boletos_{fecha_iso[:10]}.ndjson"
+        ruta = self._prefijo_base + nombre_archivo
+        if ruta != self._ruta_registro_metadatos:
+            self._cerrar_registro_metadatos()
+            self._fd_registro_metadatos = os.open(
+                ruta, os.O_WRONLY | os.O_CREAT | os.O_APPEND | _O_BINARIO, 0o644
+            )
+            self._ruta_registro_metadatos = ruta
+        os.write(self._fd_registro_metadatos, linea)
+        if getattr(self.config.archivos, "durabilidad_estricta", False):
+            getattr(os, "fdatasync", os.fsync)(self._fd_registro_metadatos)
+        return nombre_archivo
+
+    def _cerrar_registro_metadatos(self) -> None:
+        """Sincroniza y cierra el registro NDJSON de metadatos, si está abierto."""
+        fd = self._fd_registro_metadatos
+        if fd is None:
+            return
+        self._fd_registro_metadatos = None
+        self._ruta_registro_metadatos = None
+        try:
+            getattr(os, "fdatasync", os.fsync)(fd)
+        finally:
+            os.close(fd)
+
     def guardar_imagen_fallida(
         self, imagen: np.ndarray, razon: str = "desconocida"
     ) -> Optional[str]:
@@ -631,11 +1032,12 @@ class GestorDatos:
             nombre_archivo = f"fallida_{timestamp_fallida}_{razon_limpia}.jpg"
             ruta_completa = os.path.join(ruta_fallidas, nombre_archivo)
 
-            # Guardar imagen
-            exito = cv2.imwrite(ruta_completa, imagen, [cv2.IMWRITE_JPEG_QUALITY, 80])
-
+            # Guardar imagen: el buffer codificado se vuelca directamente al
+            # archivo, sin copia intermedia a bytes
+            exito, buffer = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, 80])
             if exito:
-                self.logger.debug(f"Imagen fallida guardada: {nombre_archivo}")
+                buffer.tofile(ruta_completa)
+                self.logger.debug("Imagen fallida guardada: %s", nombre_archivo)
                 return ruta_completa
             else:
                 self.logger.warning(f"No se pudo guardar imagen fallida")
@@ -650,6 +1052,7 @@ class GestorDatos:
         rutas_imagenes: Dict[str, str],
         codigo_barras: str,
         metadata_adicional: Optional[Dict[str, Any]] = None,
+        fecha_iso: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Construye el diccionario de metadatos para un boleto.
@@ -658,13 +1061,14 @@ class GestorDatos:
             rutas_imagenes: Diccionario con rutas de las imágenes.
             codigo_barras: Código decodificado.
             metadata_adicional: Metadatos adicionales opcionales.
+            fecha_iso: Fecha de captura en ISO 8601. Si es None, la actual.
 
         Returns:
             Diccionario completo de metadatos.
         """
         datos = {
             "codigo_barras": codigo_barras,
-            "fecha_captura": datetime.now().isoformat(),
+            "fecha_captura": fecha_iso or datetime.now().isoformat(),
             "modo_color": self.config.camara.modo_color,
             "resolucion_captura": self.config.camara.resolucion_captura,
             "version_aplicacion": "1.0.0",
@@ -685,12 +1089,15 @@ class GestorDatos:
 
         return datos
 
-    def finalizar_captura_boleto(self, datos_boleto: Dict[str, Any]) -> Dict[str, Any]:
+    def finalizar_captura_boleto(
+        self, datos_boleto: Dict[str, Any], fecha_iso: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Finaliza la captura de un boleto guardando todos los datos.
 
         Args:
             datos_boleto: Datos completos del boleto.
+            fecha_iso: Fecha de guardado en ISO 8601. Si es None, la actual.
 
         Returns:
             Datos del boleto con rutas incluidas.
@@ -699,17 +1106,19 @@ class GestorDatos:
             ErrorGuardadoDatos: Si no se puede guardar.
         """
         try:
+            archivos = self.config.archivos
             # Guardar metadatos
-            ruta_metadata = self.guardar_metadatos(datos_boleto)
+            ruta_metadata = self.guardar_metadatos(datos_boleto, fecha_iso)
 
             # Añadir ruta de metadatos a los datos
             datos_boleto["ruta_metadatos"] = ruta_metadata
 
-            modo = (
-                "SEGURO"
-                if self.config.archivos.evitar_sobreescritura
-                else "SOBREESCRITURA"
-            )
+            # Con durabilidad estricta los archivos ya se sincronizaron uno a
+            # uno; falta hacer persistentes sus entradas, una vez por boleto
+            if getattr(archivos, "durabilidad_estricta", False):
+                _sincronizar_directorio(self._directorio_actual)
+
+            modo = "SEGURO" if archivos.evitar_sobreescritura else "SOBREESCRITURA"
             self.logger.info(
                 f"Captura finalizada para boleto: {datos_boleto['codigo_barras']} "
                 f"(directorio: {self._directorio_actual}, modo: {modo})"
@@ -717,16 +1126,17 @@ class GestorDatos:
 
             # Solo resetear directorio si evitar_sobreescritura está activado
             # Si está desactivado, mantener el directorio para reutilizar
-            if self.config.archivos.evitar_sobreescritura:
+            if archivos.evitar_sobreescritura:
                 self._directorio_actual = None  # Resetear para próxima captura
 
             self._codigo_actual = None
             self._timestamp_actual = None
+            self._fecha_boleto = None
 
             return datos_boleto
 
         except Exception as e:
-            self._errores_guardado += 1
+            self._registrar_error()
             raise ErrorGuardadoDatos(f"Error al finalizar captura: {e}")
 
     def finalizar_captura(
@@ -743,25 +1153,28 @@ class GestorDatos:
             # Solo iniciar captura - esto manejará la creación del directorio
             self.iniciar_captura_boleto(codigo)
 
-            # Guardar imágenes
-            rutas = {}
-
-            if imagen_frente is not None:
-                ruta_frente = self.guardar_imagen(imagen_frente, "frente")
-                rutas["frente"] = ruta_frente
-                self.logger.info(f"Frente guardado: {ruta_frente}")
-
-            if imagen_reverso is not None:
-                ruta_reverso = self.guardar_imagen(imagen_reverso, "reverso")
-                rutas["reverso"] = ruta_reverso
-                self.logger.info(f"Reverso guardado: {ruta_reverso}")
+            # Guardar imágenes en paralelo (OpenCV libera el GIL al codificar).
+            # Se espera a todas, también si alguna falla: el llamador reutiliza
+            # los arrays de las imágenes en la siguiente captura
+            futuros = {
+                etiqueta: self._io_pool.submit(self.guardar_imagen, imagen, tipo)
+                for tipo, etiqueta, imagen in (
+                    ("frente", "Frente", imagen_frente),
+                    ("reverso", "Reverso", imagen_reverso),
+                    ("roi", "ROI", imagen_roi),
+                )
+                if imagen is not None
+            }
+            wait(futuros.values())
 
-            if imagen_roi is not None:
-                ruta_roi = self.guardar_imagen(imagen_roi, "roi")
-                rutas["roi"] = ruta_roi
-                self.logger.info(f"ROI guardado: {ruta_roi}")
+            rutas = {}
+            for etiqueta, futuro in futuros.items():
+                ruta = futuro.result()
+                rutas[etiqueta.lower()] = ruta
+                self.logger.info(f"{etiqueta} guardado: {ruta}")
 
-            # Construir metadatos
+            # Construir metadatos. Una sola fecha para captura y guardado
+            fecha_iso = datetime.now().isoformat()
             datos = self.construir_datos_boleto(
                 rutas_imagenes=rutas,
                 codigo_barras=codigo,
@@ -771,10 +1184,11 @@ class GestorDatos:
                     if imagen_reverso is not None
                     else "Desconocida",
                 },
+                fecha_iso=fecha_iso,
             )
 
             # Finalizar captura (pero mantener el directorio actual si evitar_sobreescritura=false)
-            self.finalizar_captura_boleto(datos)
+            self.finalizar_captura_boleto(datos, fecha_iso)
             self.logger.info(f"Captura finalizada para código: {codigo}")
             return True
 
@@ -782,20 +1196,47 @@ class GestorDatos:
             self.logger.error(f"Error en finalizar_captura: {e}")
             return False
 
+    def _ruta_relativa(self, ruta_completa: str) -> str:
+        """
+        Devuelve la ruta de un archivo relativa a ruta_base.
+
+        Args:
+            ruta_completa: Ruta de un archivo del directorio actual.
+
+        Returns:
+            Ruta relativa desde la base.
+        """
+        if ruta_completa.startswith(self._prefijo_base):
+            return ruta_completa[len(self._prefijo_base) :]
+        return os.path.relpath(ruta_completa, self.config.archivos.ruta_base)
+
+    def _registrar_archivo(self, tamaño_bytes: int) -> None:
+        """Suma un archivo guardado a las estadísticas."""
+        with self._lock_estadisticas:
+            self._archivos_guardados += 1
+            self._bytes_guardados += tamaño_bytes
+
+    def _registrar_error(self) -> None:
+        """Suma un error de guardado a las estadísticas."""
+        with self._lock_estadisticas:
+            self._errores_guardado += 1
+
     def obtener_ruta_directorio_actual(self) -> Optional[str]:
         """Obtiene la ruta del directorio actual de trabajo."""
         return self._directorio_actual
 
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """Obtiene estadísticas del gestor de datos."""
+        with self._lock_estadisticas:
+            archivos = self._archivos_guardados
+            bytes_guardados = self._bytes_guardados
+            errores = self._errores_guardado
         return {
-            "archivos_guardados": self._archivos_guardados,
-            "bytes_guardados": self._bytes_guardados,
-            "errores_guardado": self._errores_guardado,
+            "archivos_guardados": archivos,
+            "bytes_guardados": bytes_guardados,
+            "errores_guardado": errores,
             "directorio_actual": self._directorio_actual,
-            "bytes_por_archivo": (
-                self._bytes_guardados / max(1, self._archivos_guardados)
-            ),
+            "bytes_por_archivo": bytes_guardados / max(1, archivos),
             "estructura_organizacion": self.config.archivos.estructura_directorios,
             "evitar_sobreescritura": self.config.archivos.evitar_sobreescritura,
         }
@@ -825,31 +1266,63 @@ class GestorDatos:
             if not os.path.exists(ruta_base):
                 return 0
 
-            fecha_limite = datetime.now().timestamp() - (dias_a_conservar * 24 * 3600)
+            fecha_limite = datetime.now() - timedelta(days=dias_a_conservar)
+            formato_fecha = self.config.archivos.formato_fecha
             directorios_eliminados = 0
 
-            for nombre in os.listdir(ruta_base):
-                ruta_directorio = os.path.join(ruta_base, nombre)
-
-                # Verificar que es un directorio con formato de fecha
-                if not os.path.isdir(ruta_directorio):
-                    continue
-
-                try:
-                    # Intentar parsear como fecha
-                    fecha_directorio = datetime.strptime(
-                        nombre, self.config.archivos.formato_fecha
-                    )
-
-                    # Verificar si es más viejo que el límite
-                    if fecha_directorio.timestamp() < fecha_limite:
-                        shutil.rmtree(ruta_directorio)
-                        directorios_eliminados += 1
-                        self.logger.info(f"Directorio eliminado: {ruta_directorio}")
+            # Con el formato ISO el orden de los nombres es el cronológico: basta
+            # comparar cadenas, sin strptime por entrada. El día del límite entra
+            # con <= porque su medianoche ya es anterior al instante límite
+            limite_iso = (
+                fecha_limite.strftime("%Y-%m-%d")
+                if formato_fecha == "%Y-%m-%d"
+                else None
+            )
 
-                except (ValueError, shutil.Error) as e:
-                    # Ignorar directorios que no son fechas o errores al eliminar
-                    continue
+            # scandir trae el tipo de cada entrada del propio listado, sin un
+            # stat por directorio
+            directorios_viejos = []
+            with os.scandir(ruta_base) as entradas:
+                for entrada in entradas:
+                    # Verificar que es un directorio con formato de fecha
+                    if not entrada.is_dir(follow_symlinks=False):
+                        continue
+
+                    try:
+                        if limite_iso is not None:
+                            es_viejo = (
+                                _PATRON_FECHA_ISO.fullmatch(entrada.name) is not None
+                                and entrada.name <= limite_iso
+                            )
+                        else:
+                            # Intentar parsear como fecha
+                            fecha_directorio = datetime.strptime(
+                                entrada.name, formato_fecha
+                            )
+                            es_viejo = fecha_directorio < fecha_limite
+
+                        # Verificar si es más viejo que el límite
+                        if es_viejo:
+                            directorios_viejos.append(entrada.path)
+
+                    except ValueError:
+                        # Ignorar directorios que no son fechas
+                        continue
+
+            # Borrar en paralelo: rmtree pasa casi todo el tiempo esperando a
+            # unlink, que libera el GIL
+            if directorios_viejos:
+                with ThreadPoolExecutor(
+                    max_workers=min(4, len(directorios_viejos))
+                ) as pool:
+                    resultados = pool.map(_eliminar_arbol, directorios_viejos)
+                    for ruta_directorio, eliminado in zip(
+                        directorios_viejos, resultados
+                    ):
+                        # Ignorar errores al eliminar
+                        if eliminado:
+                            directorios_eliminados += 1
+                            self.logger.info(f"Directorio eliminado: {ruta_directorio}")
 
             if directorios_eliminados > 0:
                 self.logger.info(
@@ -862,16 +1335,27 @@ class GestorDatos:
             self.logger.error(f"Error al limpiar directorios viejos: {e}")
             return 0
 
-    def __del__(self):
-        """Destructor para logging."""
+    def cerrar(self) -> None:
+        """
+        Termina las escrituras pendientes, cierra el registro de metadatos y
+        registra las estadísticas finales. Llamadas repetidas no hacen nada.
+        """
+        if self._cerrado:
+            return
+        self._cerrado = True
+        _GESTORES_ABIERTOS.discard(self)
+
+        self._io_pool.shutdown(wait=True)
         try:
-            stats = self.obtener_estadisticas()
-            if stats["archivos_guardados"] > 0:
-                modo = "SEGURO" if stats["evitar_sobreescritura"] else "SOBREESCRITURA"
-                self.logger.info(
-                    f"GestorDatos finalizado (modo: {modo}). "
-                    f"Archivos: {stats['archivos_guardados']}, "
-                    f"Bytes: {stats['bytes_guardados'] / 1024 / 1024:.1f} MB"
-                )
-        except:
-            pass  # Ignorar errores en destructor
+            self._cerrar_registro_metadatos()
+        except OSError as e:
+            self.logger.error(f"Error al cerrar registro de metadatos: {e}")
+
+        stats = self.obtener_estadisticas()
+        if stats["archivos_guardados"] > 0:
+            modo = "SEGURO" if stats["evitar_sobreescritura"] else "SOBREESCRITURA"
+            self.logger.info(
+                f"GestorDatos finalizado (modo: {modo}). "
+                f"Archivos: {stats['archivos_guardados']}, "
+                f"Bytes: {stats['bytes_guardados'] / 1024 / 1024:.1f} MB"
+            )
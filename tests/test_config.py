@@ -0,0 +1,42 @@
+"""Pruebas de la construcción de secciones de la configuración."""
+
+import os
+
+import yaml
+
+from config import ArchivosCfg, Configuracion, ProcesamientoCfg, RegionBarrasCfg
+
+RUTA_CONFIG = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "config", "config.yaml"
+)
+
+
+def _cargar_yaml():
+    with open(RUTA_CONFIG, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def test_clave_extra_conserva_esquema_y_valores_por_defecto():
+    datos = _cargar_yaml()["archivos"]
+    datos["clave_de_usuario"] = 1
+    for clave in ("compresion_png", "metadatos_ndjson", "durabilidad_estricta"):
+        datos.pop(clave, None)
+
+    seccion, extra = Configuracion._construir_seccion("archivos", datos)
+
+    assert isinstance(seccion, ArchivosCfg)
+    assert seccion.compresion_png == 3
+    assert seccion.metadatos_ndjson is False
+    assert seccion.durabilidad_estricta is False
+    assert extra == {"archivos": {"clave_de_usuario": 1}}
+
+
+def test_clave_extra_en_region_barras():
+    datos = _cargar_yaml()["procesamiento"]
+    datos["region_barras"]["margen"] = 0.05
+
+    seccion, extra = Configuracion._construir_seccion("procesamiento", datos)
+
+    assert isinstance(seccion, ProcesamientoCfg)
+    assert isinstance(seccion.region_barras, RegionBarrasCfg)
+    assert extra == {"procesamiento.region_barras": {"margen": 0.05}}
@@ -0,0 +1,64 @@
+"""Pruebas de DecodificadorBarras con pyzbar real."""
+
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+# Sin la biblioteca zbar instalada, pyzbar falla con ImportError al importar
+pyzbar = pytest.importorskip("pyzbar.pyzbar", exc_type=ImportError)
+barcode = pytest.importorskip("barcode")
+from barcode.writer import ImageWriter  # noqa: E402
+
+import core.decodificador as decodificador  # noqa: E402
+from core.decodificador import DecodificadorBarras  # noqa: E402
+
+CODIGO = "12345678"
+
+
+def _roi_codigo() -> np.ndarray:
+    """ROI en escala de grises con un CODE128 legible."""
+    imagen = barcode.get("code128", CODIGO, writer=ImageWriter()).render(
+        {"write_text": False}
+    )
+    return cv2.cvtColor(np.asarray(imagen), cv2.COLOR_RGB2GRAY)
+
+
+def test_variantes_apiladas_legibles_devuelven_codigo(monkeypatch):
+    # La ROI en gris "falla" para forzar la imagen apilada, donde el código es
+    # legible en varias franjas y ZBar funde las lecturas en un solo rect
+    llamadas = []
+
+    def decode_sin_gris(imagen):
+        llamadas.append(imagen.shape)
+        if len(llamadas) == 1:
+            return []
+        return pyzbar.decode(imagen)
+
+    monkeypatch.setattr(decodificador, "decode", decode_sin_gris)
+    deco = DecodificadorBarras()
+    deco._detector_opencv = None
+    try:
+        assert deco.decodificar(_roi_codigo()) == CODIGO
+        assert len(llamadas) == 2
+    finally:
+        deco.cerrar()
+
+
+def test_descartar_pendiente_no_entrega_codigo_anterior(monkeypatch):
+    liberar = threading.Event()
+    deco = DecodificadorBarras()
+
+    def decodificar_lento(roi):
+        liberar.wait(5)
+        return CODIGO
+
+    monkeypatch.setattr(deco, "decodificar", decodificar_lento)
+    try:
+        assert deco.decodificar_async(_roi_codigo())
+        deco.descartar_pendiente()
+        liberar.set()
+        assert deco.obtener_resultado_async() is None
+    finally:
+        deco.cerrar()
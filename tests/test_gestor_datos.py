@@ -0,0 +1,104 @@
+"""Pruebas de GestorDatos sobre un directorio temporal real."""
+
+import gc
+import json
+import os
+import weakref
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import yaml
+
+import core.gestor_datos as gestor_datos
+from config import Configuracion, config
+from core.gestor_datos import GestorDatos
+
+RUTA_CONFIG = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "config", "config.yaml"
+)
+
+
+@pytest.fixture
+def gestor(tmp_path):
+    """GestorDatos con la configuración del proyecto y ruta_base temporal."""
+    archivos = replace(
+        config().archivos,
+        ruta_base=str(tmp_path),
+        evitar_sobreescritura=True,
+        metadatos_ndjson=False,
+    )
+    gestor = GestorDatos(SimpleNamespace(archivos=archivos))
+    yield gestor
+    gestor.cerrar()
+
+
+def _guardar_boleto(gestor, codigo):
+    gestor.iniciar_captura_boleto(codigo)
+    ruta_relativa = gestor.guardar_metadatos({"codigo_barras": codigo})
+    return os.path.join(gestor.config.archivos.ruta_base, ruta_relativa)
+
+
+def test_guardar_metadatos_crea_json(gestor):
+    ruta = _guardar_boleto(gestor, "123456")
+
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    assert datos["codigo_barras"] == "123456"
+    assert gestor.obtener_estadisticas()["errores_guardado"] == 0
+
+
+def test_guardar_metadatos_no_sobreescribe(gestor):
+    primera = _guardar_boleto(gestor, "123456")
+    segunda = _guardar_boleto(gestor, "123456")
+
+    assert primera != segunda
+    assert os.path.exists(primera) and os.path.exists(segunda)
+
+
+def test_guardar_metadatos_sin_enlace_escribe_directo(gestor, monkeypatch):
+    def enlace_no_permitido(fd, ruta):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(gestor_datos, "_enlazar_anonimo", enlace_no_permitido)
+
+    ruta = _guardar_boleto(gestor, "654321")
+
+    with open(ruta, encoding="utf-8") as f:
+        assert json.load(f)["codigo_barras"] == "654321"
+
+
+@pytest.mark.parametrize("como_esquema", [True, False])
+def test_guardar_boleto_con_clave_extra_en_yaml(tmp_path, como_esquema):
+    # Sección archivos de un config.yaml de usuario: una clave que el esquema
+    # no conoce y sin las claves añadidas después. Se prueba construida con el
+    # esquema y como SimpleNamespace simple (configuraciones inyectadas)
+    with open(RUTA_CONFIG, encoding="utf-8") as f:
+        datos = yaml.safe_load(f)["archivos"]
+    datos.update(ruta_base=str(tmp_path), formato_imagen="png", clave_de_usuario=1)
+    for clave in ("compresion_png", "metadatos_ndjson", "durabilidad_estricta"):
+        del datos[clave]
+    if como_esquema:
+        archivos, _ = Configuracion._construir_seccion("archivos", datos)
+    else:
+        archivos = SimpleNamespace(**datos)
+
+    gestor = GestorDatos(SimpleNamespace(archivos=archivos, camara=config().camara))
+    try:
+        imagen = np.zeros((60, 80, 3), dtype=np.uint8)
+        assert gestor.finalizar_captura(imagen, imagen, "123456")
+        assert gestor.obtener_estadisticas()["errores_guardado"] == 0
+    finally:
+        gestor.cerrar()
+
+
+def test_gestor_sin_cerrar_se_libera(tmp_path):
+    archivos = replace(config().archivos, ruta_base=str(tmp_path))
+    gestor = GestorDatos(SimpleNamespace(archivos=archivos))
+    referencia = weakref.ref(gestor)
+
+    del gestor
+    gc.collect()
+
+    assert referencia() is None
@@ -182,8 +182,7 @@ class PrevisualizadorWidget(QWidget):
         alto, ancho = frame_viz.shape[:2]
 
         # 5. OBTENER ESTADO ACTUAL
-        estado = getattr(self._capturador, "_estado", None)
-        estado_val = estado.value if hasattr(estado, "value") else str(estado)
+        estado_val = str(getattr(self._capturador, "estado", None))
 
         # 6. DIBUJAR GUIAS SEGÚN ESTADO (SOLO SI EL FRAME ES VÁLIDO)
         try: